@@ -0,0 +1,168 @@
+import re
+from collections import Counter
+from typing import Iterable, TypeAlias
+from uuid import UUID
+
+import numpy as np
+from numpy.typing import NDArray
+
+import models
+
+Series: TypeAlias = NDArray[np.float64]
+Words: TypeAlias = list[tuple[str, int]]
+
+token_pattern = re.compile(r"\w+")
+
+
+class SelectorColumn:
+    def __init__(self, question: models.poll.SelectorQuestion) -> None:
+        self.answers = 0
+        self.counts = np.zeros(len(question.options), np.int64)
+        self.pending: list[int] = []
+
+    def add(self, value: models.answers.SelectorValue) -> None:
+        self.answers += 1
+        self.pending.extend(value.selected)
+
+    def pack(self) -> None:
+        if len(self.pending) > 0:
+            selected = np.fromiter(self.pending, np.int64, len(self.pending))
+            self.counts += np.bincount(selected, minlength=len(self.counts))
+            self.pending.clear()
+
+    def series(self) -> Series:
+        self.pack()
+        return self.counts.astype(np.float64)
+
+
+class SliderColumn:
+    def __init__(self, question: models.poll.SliderQuestion) -> None:
+        self.answers = 0
+        self.sums = np.zeros(len(question.options), np.int64)
+        self.pending: list[int] = []
+
+    def add(self, value: models.answers.SliderValue) -> None:
+        self.answers += 1
+        self.pending.extend(value.sliders)
+
+    def pack(self) -> None:
+        if len(self.pending) > 0:
+            sliders = np.fromiter(self.pending, np.int64, len(self.pending))
+            self.sums += sliders.reshape(-1, len(self.sums)).sum(axis=0)
+            self.pending.clear()
+
+    def series(self) -> Series:
+        self.pack()
+        return self.sums / max(self.answers, 1)
+
+
+class TopListColumn:
+    def __init__(self, question: models.poll.TopListQuestion) -> None:
+        self.answers = 0
+        self.scores = np.zeros(len(question.options), np.int64)
+        self.pending: list[int] = []
+        self.places: list[int] = []
+
+    def add(self, value: models.answers.TopListValue) -> None:
+        self.answers += 1
+        self.pending.extend(value.ranks)
+        self.places.extend(range(len(value.ranks)))
+
+    def pack(self) -> None:
+        if len(self.pending) > 0:
+            ranks = np.fromiter(self.pending, np.int64, len(self.pending))
+            places = np.fromiter(self.places, np.int64, len(self.places))
+            self.scores += np.bincount(
+                ranks,
+                weights=len(self.scores) - places,
+                minlength=len(self.scores),
+            ).astype(np.int64)
+            self.pending.clear()
+            self.places.clear()
+
+    def series(self) -> Series:
+        self.pack()
+        return self.scores.astype(np.float64)
+
+
+class TextColumn:
+    def __init__(self, question: models.poll.TextQuestion) -> None:
+        self.answers = 0
+        self.tokens: Counter[str] = Counter()
+        self.pending: list[str] = []
+
+    def add(self, value: models.answers.TextValue) -> None:
+        self.answers += 1
+        self.pending.append(value.text)
+
+    def pack(self) -> None:
+        if len(self.pending) > 0:
+            self.tokens.update(token_pattern.findall("\n".join(self.pending).lower()))
+            self.pending.clear()
+
+    def words(self, limit: int) -> Words:
+        self.pack()
+        return self.tokens.most_common(limit)
+
+
+Column: TypeAlias = SelectorColumn | SliderColumn | TopListColumn | TextColumn
+
+
+def new_column(question: models.poll.Question) -> Column:
+    if isinstance(question, models.poll.SelectorQuestion):
+        return SelectorColumn(question)
+    if isinstance(question, models.poll.SliderQuestion):
+        return SliderColumn(question)
+    if isinstance(question, models.poll.TopListQuestion):
+        return TopListColumn(question)
+    return TextColumn(question)
+
+
+class Aggregator:
+    def __init__(self, poll: models.poll.PollSchema, chunk_size: int) -> None:
+        self.poll = poll
+        self.chunk_size = chunk_size
+        self.columns: dict[UUID, Column] = {
+            question_id: new_column(question)
+            for question_id, question in poll.uuids.items()
+        }
+        self.buffered = 0
+
+    def add(self, values: Iterable[models.answers.Value]) -> None:
+        columns = self.columns
+        for value in values:
+            column = columns.get(value.question_id)
+            if column is not None:
+                column.add(value)  # type: ignore[arg-type]
+                self.buffered += 1
+
+        if self.buffered >= self.chunk_size:
+            self.pack()
+
+    def add_answers(self, answers: Iterable[models.answers.Answer]) -> None:
+        for answer in answers:
+            self.add(answer.answer.values)
+
+    def pack(self) -> None:
+        for column in self.columns.values():
+            column.pack()
+        self.buffered = 0
+
+    def series(self, plot: models.poll.BaseNumberPlot) -> dict[UUID, Series]:
+        series: dict[UUID, Series] = {}
+        for question in plot.questions:
+            column = self.columns[question.question_id]
+            assert not isinstance(column, TextColumn)
+            values = column.series()
+            if isinstance(plot, (models.poll.PiePlot, models.poll.DoughnutPlot)):
+                total = values.sum()
+                values = values / total if total > 0 else values
+            series[question.question_id] = values
+        return series
+
+    def words(self, plot: models.poll.WordCloudPlot, limit: int) -> dict[UUID, Words]:
+        return {
+            question.question_id: column.words(limit)
+            for question in plot.questions
+            if isinstance(column := self.columns[question.question_id], TextColumn)
+        }
@@ -1,24 +1,88 @@
-from asyncio import CancelledError, Task, create_task
-from typing import Callable, Coroutine
+import logging
+from asyncio import (
+    CancelledError,
+    Future,
+    Queue,
+    Task,
+    TimeoutError,
+    TimerHandle,
+    create_task,
+    get_running_loop,
+    shield,
+    sleep,
+)
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from json import loads
+from random import uniform
+from time import monotonic
+from typing import Any, Callable, Coroutine, TypeAlias
+from uuid import UUID
 
 import aiohttp
+from pydantic import parse_raw_as
 from websockets.client import connect
+from websockets.exceptions import WebSocketException
 from yarl import URL
 
 import models
+from resilience import CircuitBreaker, CircuitOpen, Endpoint, LatencyTracker
 from settings import settings
+from transport import transport
 
-client = aiohttp.ClientSession()
+log = logging.getLogger(__name__)
+
+
+Listener: TypeAlias = Callable[[str | bytes], Coroutine[None, None, None]]
+Subscriber: TypeAlias = Callable[[models.poll.Question], Coroutine[None, None, None]]
 
 
 class HTTPException(Exception):
     pass
 
 
-async def listen_questions(
-    poll_id: int,
-    on_message: Callable[[str | bytes], Coroutine[None, None, None]],
-) -> Task[None]:
+def transient(exc: Exception) -> bool:
+    if isinstance(exc, HTTPException):
+        status = exc.args[0]
+        return status >= 500 or status == 429
+    return isinstance(exc, (aiohttp.ClientError, TimeoutError))
+
+
+breaker = CircuitBreaker(settings.api_breaker_threshold, settings.api_breaker_reset)
+
+
+def endpoint(idempotent: bool) -> Endpoint[Any]:
+    return Endpoint(
+        LatencyTracker(
+            settings.api_latency_window,
+            settings.api_timeout_quantile,
+            settings.api_timeout_multiplier,
+            settings.api_min_timeout if idempotent else settings.api_answers_timeout,
+            settings.api_max_timeout if idempotent else settings.api_answers_timeout,
+        ),
+        breaker,
+        settings.api_hedge_quantile if idempotent else None,
+        transient,
+    )
+
+
+endpoints = {
+    "polls/get": endpoint(idempotent=True),
+    "answers/add/value": endpoint(idempotent=False),
+    "answers/add/values": endpoint(idempotent=False),
+}
+
+
+def reconnect_delay(attempts: int) -> float:
+    delay = min(
+        settings.websocket_reconnect_delay * 2 ** (attempts - 1),
+        settings.websocket_max_reconnect_delay,
+    )
+    return uniform(delay / 2, delay)
+
+
+async def listen_questions(poll_id: int, on_message: Listener) -> Task[None]:
     url = str(
         (URL(settings.websocket_url) / "answers/listen/questions").with_query(
             {"poll_id": poll_id}
@@ -26,15 +90,256 @@ async def listen_questions(
     )
 
     async def listener() -> None:
-        async with connect(url) as websocket:
+        attempts = 0
+        try:
+            while True:
+                try:
+                    async with connect(url) as websocket:
+                        attempts = 0
+                        while True:
+                            data = await websocket.recv()
+                            await on_message(data)
+                except (OSError, TimeoutError, WebSocketException) as exc:
+                    attempts += 1
+                    delay = reconnect_delay(attempts)
+                    log.warning(
+                        "Questions of poll %s disconnected, reconnecting in %.1fs",
+                        poll_id,
+                        delay,
+                        exc_info=exc,
+                    )
+                    await sleep(delay)
+        except CancelledError:
+            pass
+
+    return create_task(listener())
+
+
+class QuestionModel(models.BaseModel):
+    data: models.poll.Question
+
+
+class Delivery:
+    def __init__(self, poll_id: int, on_message: Subscriber) -> None:
+        self.poll_id = poll_id
+        self.on_message = on_message
+        self.queue: Queue[models.poll.Question] = Queue()
+        self.task = create_task(self.run())
+
+    def put(self, question: models.poll.Question) -> None:
+        self.queue.put_nowait(question)
+
+    async def run(self) -> None:
+        while True:
+            question = await self.queue.get()
             try:
-                while True:
-                    data = await websocket.recv()
-                    await on_message(data)
+                await self.on_message(question)
             except CancelledError:
-                pass
+                raise
+            except Exception:
+                log.exception("Subscriber of poll %s failed", self.poll_id)
+
+    def close(self) -> None:
+        self.task.cancel()
+
+
+class QuestionsHub:
+    def __init__(self, frames_size: int) -> None:
+        self.frames_size = frames_size
+        self.subscribers: dict[int, dict[int, Delivery]] = {}
+        self.frames: dict[int, OrderedDict[str | bytes, models.poll.Question]] = {}
+        self.questions: dict[int, dict[UUID, models.poll.Question]] = {}
+        self.tasks: dict[int, Task[None]] = {}
+        self.on_question: list[Callable[[models.poll.Question], None]] = []
+
+    async def subscribe(
+        self,
+        poll_id: int,
+        user_id: int,
+        on_message: Subscriber,
+    ) -> None:
+        subscribers = self.subscribers.setdefault(poll_id, {})
+        previous = subscribers.get(user_id)
+        if previous is not None:
+            previous.close()
+        delivery = subscribers[user_id] = Delivery(poll_id, on_message)
+
+        if poll_id not in self.tasks:
+            self.frames[poll_id] = OrderedDict()
+            self.questions[poll_id] = {}
+            self.tasks[poll_id] = await listen_questions(
+                poll_id,
+                partial(self.broadcast, poll_id),
+            )
+
+        for question in self.frames[poll_id].values():
+            delivery.put(question)
+
+    async def unsubscribe(self, poll_id: int, user_id: int) -> None:
+        subscribers = self.subscribers.get(poll_id, {})
+        delivery = subscribers.pop(user_id, None)
+        if delivery is not None:
+            delivery.close()
+
+        if len(subscribers) == 0:
+            self.subscribers.pop(poll_id, None)
+            self.frames.pop(poll_id, None)
+            self.questions.pop(poll_id, None)
+            task = self.tasks.pop(poll_id, None)
+            if task is not None:
+                task.cancel()
+                await task
+
+    def decode(self, poll_id: int, data: str | bytes) -> models.poll.Question:
+        frames = self.frames[poll_id]
+        questions = self.questions[poll_id]
+        question = frames.get(data)
+        if question is not None:
+            frames.move_to_end(data)
+            return question
+
+        question = QuestionModel(data=loads(data)).data
+        for frame in [
+            frame
+            for frame, previous in frames.items()
+            if previous.question_id == question.question_id
+        ]:
+            del frames[frame]
+        frames[data] = questions[question.question_id] = question
+        while len(frames) > self.frames_size:
+            _, dropped = frames.popitem(last=False)
+            if questions.get(dropped.question_id) is dropped:
+                del questions[dropped.question_id]
+
+        for on_question in self.on_question:
+            on_question(question)
+        return question
+
+    def question(
+        self,
+        poll_id: int,
+        question_id: UUID,
+    ) -> models.poll.Question | None:
+        return self.questions.get(poll_id, {}).get(question_id)
+
+    async def broadcast(self, poll_id: int, data: str | bytes) -> None:
+        try:
+            question = self.decode(poll_id, data)
+        except ValueError:
+            log.exception("Invalid question frame of poll %s", poll_id)
+            return
+
+        for delivery in self.subscribers.get(poll_id, {}).values():
+            delivery.put(question)
+
+
+questions_hub = QuestionsHub(settings.questions_frames_size)
+
+
+async def polls_get(
+    poll_id: int,
+    etag: str | None = None,
+) -> tuple[models.poll.Poll | None, str | None]:
+    url = str((URL(settings.api_url) / "polls/get").with_query({"poll_id": poll_id}))
+    headers = {} if etag is None else {"If-None-Match": etag}
+
+    async def request() -> tuple[models.poll.Poll | None, str | None]:
+        async with transport.client.get(url, headers=headers) as response:
+            if response.status == 304:
+                return None, etag
+            if response.status != 200:
+                raise HTTPException(response.status, await response.text())
+            return (
+                models.poll.Poll.parse_raw(await response.text()),
+                response.headers.get("ETag"),
+            )
+
+    return await endpoints["polls/get"].call(request)
 
-    return create_task(listener())
+
+@dataclass
+class CachedPoll:
+    poll: models.poll.Poll
+    etag: str | None
+    validated: float
+    used: float
+
+
+class PollCache:
+    def __init__(self, size: int, ttl: float, revalidate: float) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.polls: OrderedDict[int, CachedPoll] = OrderedDict()
+        self.fetching: dict[int, Task[models.poll.Poll]] = {}
+
+    async def get(self, poll_id: int) -> models.poll.Poll:
+        now = monotonic()
+        self.expire(now)
+
+        cached = self.polls.get(poll_id)
+        if cached is not None:
+            cached.used = now
+            self.polls.move_to_end(poll_id)
+            if now - cached.validated < self.revalidate:
+                return cached.poll
+
+        task = self.fetching.get(poll_id)
+        if task is None:
+            task = self.fetching[poll_id] = create_task(self.fetch(poll_id, cached))
+            task.add_done_callback(lambda _: self.fetching.pop(poll_id, None))
+        return await shield(task)
+
+    async def fetch(
+        self,
+        poll_id: int,
+        cached: CachedPoll | None,
+    ) -> models.poll.Poll:
+        try:
+            poll, etag = await polls_get(
+                poll_id, None if cached is None else cached.etag
+            )
+        except Exception as exc:
+            if cached is None or not (isinstance(exc, CircuitOpen) or transient(exc)):
+                raise
+            log.warning("Serving stale poll %s", poll_id, exc_info=exc)
+            return cached.poll
+
+        now = monotonic()
+        if poll is None:
+            assert cached is not None
+            cached.validated = now
+            return cached.poll
+
+        self.polls[poll_id] = CachedPoll(poll, etag, now, now)
+        self.polls.move_to_end(poll_id)
+        while len(self.polls) > self.size:
+            self.polls.popitem(last=False)
+        return poll
+
+    def expire(self, now: float) -> None:
+        while len(self.polls) > 0:
+            poll_id, cached = next(iter(self.polls.items()))
+            if now - cached.used <= self.ttl:
+                break
+            del self.polls[poll_id]
+
+    def discard(self, poll_id: int) -> None:
+        self.polls.pop(poll_id, None)
+
+    async def question(
+        self,
+        poll_id: int,
+        question_id: UUID,
+    ) -> models.poll.Question:
+        return (await self.get(poll_id)).poll.index[question_id].question
+
+
+polls = PollCache(
+    settings.poll_cache_size,
+    settings.poll_cache_ttl,
+    settings.poll_cache_revalidate,
+)
 
 
 async def answers_add_value(
@@ -44,7 +349,118 @@ async def answers_add_value(
     url = str(
         (URL(settings.api_url) / "answers/add/value").with_query({"poll_id": poll_id})
     )
-    async with client.post(url, json=value.serializable()) as request:
-        if request.status != 200:
-            raise HTTPException(request.status, await request.text())
-        return models.answers.Answer.parse_raw(await request.text())
+
+    async def request() -> models.answers.Answer:
+        async with transport.client.post(url, json=value.serializable()) as response:
+            if response.status != 200:
+                raise HTTPException(response.status, await response.text())
+            return models.answers.Answer.parse_raw(await response.text())
+
+    return await endpoints["answers/add/value"].call(request)
+
+
+class ValueResult(models.BaseModel):
+    status: int
+    answer: models.answers.Answer | None = None
+    detail: str | None = None
+
+
+async def answers_add_values(
+    poll_id: int,
+    values: list[models.answers.Value],
+) -> list[models.answers.Answer | HTTPException]:
+    url = str(
+        (URL(settings.api_url) / "answers/add/values").with_query({"poll_id": poll_id})
+    )
+
+    async def request() -> list[ValueResult]:
+        async with transport.client.post(
+            url, json=[v.serializable() for v in values]
+        ) as response:
+            if response.status != 200:
+                raise HTTPException(response.status, await response.text())
+            return parse_raw_as(list[ValueResult], await response.text())
+
+    results = await endpoints["answers/add/values"].call(request)
+
+    if len(results) != len(values):
+        raise HTTPException(502, f"Expected {len(values)} results, got {len(results)}")
+    return [
+        result.answer
+        if result.status == 200 and result.answer is not None
+        else HTTPException(result.status, result.detail)
+        for result in results
+    ]
+
+
+Pending: TypeAlias = tuple[models.answers.Value, Future[models.answers.Answer]]
+
+
+class AnswersBatcher:
+    def __init__(self, window: float, size: int) -> None:
+        self.window = window
+        self.size = size
+        self.pending: dict[int, list[Pending]] = {}
+        self.timers: dict[int, TimerHandle] = {}
+        self.tasks: set[Task[None]] = set()
+
+    async def add_value(
+        self,
+        poll_id: int,
+        value: models.answers.Value,
+    ) -> models.answers.Answer:
+        loop = get_running_loop()
+        future: Future[models.answers.Answer] = loop.create_future()
+        batch = self.pending.setdefault(poll_id, [])
+        batch.append((value, future))
+
+        if len(batch) >= self.size:
+            self.flush(poll_id)
+        elif poll_id not in self.timers:
+            self.timers[poll_id] = loop.call_later(self.window, self.flush, poll_id)
+
+        return await future
+
+    def flush(self, poll_id: int) -> None:
+        timer = self.timers.pop(poll_id, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self.pending.pop(poll_id, [])
+        if len(batch) > 0:
+            task = create_task(self.submit(poll_id, batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def submit(self, poll_id: int, batch: list[Pending]) -> None:
+        try:
+            results = await answers_add_values(poll_id, [value for value, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, HTTPException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+answers_batcher = (
+    None
+    if settings.answers_batch_window is None
+    else AnswersBatcher(settings.answers_batch_window, settings.answers_batch_size)
+)
+
+
+async def add_value(
+    poll_id: int,
+    value: models.answers.Value,
+) -> models.answers.Answer:
+    if answers_batcher is None:
+        return await answers_add_value(poll_id, value)
+    return await answers_batcher.add_value(poll_id, value)
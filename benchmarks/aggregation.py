@@ -0,0 +1,140 @@
+from collections import Counter
+from random import Random
+from time import perf_counter
+from uuid import UUID
+
+import models
+from aggregation import Aggregator, token_pattern
+
+
+def poll(options: int) -> models.poll.PollSchema:
+    labels = [
+        models.poll.Option(label=f"Option {i}", image=None) for i in range(options)
+    ]
+    return models.poll.PollSchema(
+        name="Benchmark",
+        plots=[
+            models.poll.BarPlot(
+                name="Selector",
+                questions=[
+                    models.poll.SelectorQuestion(
+                        label="Selector", options=labels, max_checked=3
+                    )
+                ],
+            ),
+            models.poll.RadarPlot(
+                name="Slider",
+                questions=[models.poll.SliderQuestion(label="Slider", options=labels)],
+            ),
+            models.poll.PiePlot(
+                name="Top list",
+                questions=[
+                    models.poll.TopListQuestion(
+                        label="Top list", options=labels, max_ranks=3
+                    )
+                ],
+            ),
+            models.poll.WordCloudPlot(
+                name="Words",
+                questions=[models.poll.TextQuestion(label="Text")],
+            ),
+        ],
+    )
+
+
+def answers(
+    schema: models.poll.PollSchema,
+    options: int,
+    count: int,
+) -> list[list[models.answers.Value]]:
+    random = Random(0)
+    words = [f"word{i}" for i in range(500)]
+    selector, slider, top_list, text = (
+        plot.questions[0].question_id for plot in schema.plots
+    )
+    return [
+        [
+            models.answers.SelectorValue.construct(
+                question_id=selector,
+                selected=set(random.sample(range(options), random.randint(1, 3))),
+            ),
+            models.answers.SliderValue.construct(
+                question_id=slider,
+                sliders=[random.randint(0, 10) for _ in range(options)],
+            ),
+            models.answers.TopListValue.construct(
+                question_id=top_list,
+                ranks=random.sample(range(options), 3),
+            ),
+            models.answers.TextValue.construct(
+                question_id=text,
+                text=" ".join(random.choices(words, k=5)),
+            ),
+        ]
+        for _ in range(count)
+    ]
+
+
+def naive(
+    schema: models.poll.PollSchema,
+    options: int,
+    rows: list[list[models.answers.Value]],
+) -> None:
+    selector, slider, top_list, text = (
+        plot.questions[0].question_id for plot in schema.plots
+    )
+    counts = [0] * options
+    sums = [0] * options
+    scores = [0] * options
+    tokens: Counter[str] = Counter()
+    series: dict[UUID, list[float]] = {}
+
+    for values in rows:
+        for value in values:
+            if isinstance(value, models.answers.SelectorValue):
+                for index in value.selected:
+                    counts[index] += 1
+            elif isinstance(value, models.answers.SliderValue):
+                for index, slide in enumerate(value.sliders):
+                    sums[index] += slide
+            elif isinstance(value, models.answers.TopListValue):
+                for place, index in enumerate(value.ranks):
+                    scores[index] += options - place
+            elif isinstance(value, models.answers.TextValue):
+                tokens.update(token_pattern.findall(value.text.lower()))
+
+    series[selector] = [float(count) for count in counts]
+    series[slider] = [total / len(rows) for total in sums]
+    series[top_list] = [score / sum(scores) for score in scores]
+    tokens.most_common(50)
+
+
+def bench(options: int, count: int) -> None:
+    schema = poll(options)
+    rows = answers(schema, options, count)
+
+    start = perf_counter()
+    naive(schema, options, rows)
+    plain = perf_counter() - start
+
+    start = perf_counter()
+    aggregator = Aggregator(schema, 65536)
+    for values in rows:
+        aggregator.add(values)
+    for plot in schema.plots:
+        if isinstance(plot, models.poll.WordCloudPlot):
+            aggregator.words(plot, 50)
+        else:
+            aggregator.series(plot)
+    packed = perf_counter() - start
+
+    print(
+        f"{options} options x {count} answers: "
+        f"python {plain * 1000:.0f} ms, numpy {packed * 1000:.0f} ms, "
+        f"speedup x{plain / packed:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    bench(10, 100000)
+    bench(10, 250000)
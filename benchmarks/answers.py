@@ -0,0 +1,75 @@
+from asyncio import gather, get_event_loop
+from time import perf_counter
+from typing import Awaitable, Callable, TypeAlias
+from uuid import uuid4
+
+from aiohttp import web
+
+import api
+import models
+from benchmarks.backend import Backend
+from settings import settings
+from transport import transport
+
+Submit: TypeAlias = Callable[
+    [int, models.answers.Value], Awaitable[models.answers.Answer]
+]
+
+
+def selector_poll() -> models.poll.Poll:
+    question = models.poll.SelectorQuestion(
+        label="Question",
+        options=[models.poll.Option(label=f"Option {i}", image=None) for i in range(5)],
+    )
+    return models.poll.Poll(
+        id=1,
+        owner=models.account.User(id=1, username="owner"),
+        poll=models.poll.PollSchema(
+            name="Benchmark",
+            plots=[models.poll.BarPlot(name="Plot", questions=[question])],
+        ),
+    )
+
+
+async def run(backend: Backend, name: str, submit: Submit, answers: int) -> None:
+    question_id = backend.poll.poll.plots[0].questions[0].question_id
+    values = [
+        models.answers.SelectorValue(question_id=question_id, selected={i % 5})
+        for i in range(answers)
+    ]
+    values[-1] = models.answers.SelectorValue(question_id=uuid4(), selected={0})
+    backend.requests = 0
+
+    start = perf_counter()
+    results = await gather(
+        *(submit(backend.poll.id, value) for value in values),
+        return_exceptions=True,
+    )
+    elapsed = perf_counter() - start
+
+    errors = sum(isinstance(result, Exception) for result in results)
+    print(
+        f"{name}: {answers} answers in {elapsed * 1000:.0f} ms, "
+        f"{backend.requests} requests, {errors} rejected"
+    )
+
+
+async def bench(answers: int, latency: float) -> None:
+    await transport.start()
+    backend = Backend(selector_poll(), latency)
+    runner = web.AppRunner(backend.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    settings.api_url = "http://127.0.0.1:%s" % runner.addresses[0][1]
+
+    batcher = api.AnswersBatcher(0.02, 100)
+    await run(backend, "single", api.answers_add_value, answers)
+    await run(backend, "batched", batcher.add_value, answers)
+
+    await transport.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    get_event_loop().run_until_complete(bench(2000, 0.005))
@@ -0,0 +1,88 @@
+from asyncio import sleep
+from random import random
+from typing import Any
+
+from aiohttp import web
+from pydantic import ValidationError, parse_obj_as
+
+import api
+import models
+
+
+class Backend:
+    def __init__(
+        self,
+        poll: models.poll.Poll,
+        latency: float,
+        slow_rate: float = 0,
+        slow_latency: float = 0,
+    ) -> None:
+        self.poll = poll
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.failing = False
+        self.answers: list[models.answers.Answer] = []
+        self.requests = 0
+
+    def add(self, data: Any) -> api.ValueResult:
+        try:
+            value: models.answers.Value = parse_obj_as(
+                models.answers.Value,  # type: ignore[arg-type]
+                data,
+            )
+            answer = models.answers.Answer(
+                id=len(self.answers) + 1,
+                poll=self.poll,
+                answerer=None,
+                answer=models.answers.AnswerSchema(values=[value]),
+            )
+        except ValidationError as exc:
+            return api.ValueResult(status=422, detail=str(exc))
+
+        self.answers.append(answer)
+        return api.ValueResult(status=200, answer=answer)
+
+    async def check(self, request: web.Request) -> None:
+        self.requests += 1
+        slow = random() < self.slow_rate
+        await sleep(self.slow_latency if slow else self.latency)
+        if self.failing:
+            raise web.HTTPServiceUnavailable(text="Backend is failing")
+        if int(request.query["poll_id"]) != self.poll.id:
+            raise web.HTTPNotFound(text="Poll not found")
+
+    async def receive(self, request: web.Request) -> Any:
+        await self.check(request)
+        return await request.json()
+
+    async def get_poll(self, request: web.Request) -> web.Response:
+        await self.check(request)
+        etag = f'"{hash(self.poll.json())}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(
+            text=self.poll.json(),
+            content_type="application/json",
+            headers={"ETag": etag},
+        )
+
+    async def add_value(self, request: web.Request) -> web.Response:
+        result = self.add(await self.receive(request))
+        if result.answer is None:
+            return web.Response(status=result.status, text=result.detail)
+        return web.Response(text=result.answer.json(), content_type="application/json")
+
+    async def add_values(self, request: web.Request) -> web.Response:
+        results = [self.add(data) for data in await self.receive(request)]
+        return web.Response(
+            text="[" + ",".join(result.json() for result in results) + "]",
+            content_type="application/json",
+        )
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/answers/add/value", self.add_value)
+        app.router.add_post("/answers/add/values", self.add_values)
+        app.router.add_get("/polls/get", self.get_poll)
+        return app
@@ -0,0 +1,126 @@
+from timeit import timeit
+from typing import Any, TypeAlias
+from uuid import uuid4
+
+import models
+from models.poll import (
+    AreaPlot,
+    BarPlot,
+    DoughnutPlot,
+    PiePlot,
+    PollSchema,
+    RadarPlot,
+    SelectorQuestion,
+    SliderQuestion,
+    TextQuestion,
+    TopListQuestion,
+    WordCloudPlot,
+)
+
+UnionQuestion: TypeAlias = (
+    SelectorQuestion | SliderQuestion | TopListQuestion | TextQuestion
+)
+
+
+class UnionBarPlot(BarPlot):
+    questions: list[UnionQuestion] = []
+
+
+class UnionPiePlot(PiePlot):
+    questions: list[UnionQuestion] = []
+
+
+class UnionDoughnutPlot(DoughnutPlot):
+    questions: list[UnionQuestion] = []
+
+
+class UnionRadarPlot(RadarPlot):
+    questions: list[UnionQuestion] = []
+
+
+class UnionAreaPlot(AreaPlot):
+    questions: list[UnionQuestion] = []
+
+
+class UnionWordCloudPlot(WordCloudPlot):
+    questions: list[UnionQuestion] = []
+
+
+UnionPlot: TypeAlias = (
+    UnionBarPlot
+    | UnionPiePlot
+    | UnionDoughnutPlot
+    | UnionRadarPlot
+    | UnionAreaPlot
+    | UnionWordCloudPlot
+)
+
+
+class UnionPollSchema(PollSchema):
+    plots: list[UnionPlot] = []  # type: ignore[assignment]
+
+
+def option_question(question_type: models.poll.QuestionType) -> dict[str, Any]:
+    return {
+        "question_id": str(uuid4()),
+        "question_type": question_type,
+        "label": "Question",
+        "options": [{"label": f"Option {i}", "image": None} for i in range(5)],
+    }
+
+
+def text_question() -> dict[str, Any]:
+    return {
+        "question_id": str(uuid4()),
+        "question_type": models.poll.QuestionType.text,
+        "label": "Question",
+        "max_length": 100,
+    }
+
+
+def large_poll(plots: int, questions: int) -> dict[str, Any]:
+    number_types = list(models.poll.QuestionType)[:3]
+    number_plots = list(models.poll.PlotType)[:5]
+    result = []
+
+    for index in range(plots):
+        if index % 6 == 5:
+            result.append(
+                {
+                    "plot_type": models.poll.PlotType.word_cloud,
+                    "name": f"Plot {index}",
+                    "questions": [text_question() for _ in range(questions)],
+                }
+            )
+        else:
+            question_type = number_types[index % len(number_types)]
+            result.append(
+                {
+                    "plot_type": number_plots[index % len(number_plots)],
+                    "name": f"Plot {index}",
+                    "questions": [
+                        option_question(question_type) for _ in range(questions)
+                    ],
+                }
+            )
+
+    return {"name": "Benchmark", "plots": result}
+
+
+def bench(plots: int, questions: int, number: int) -> None:
+    data = large_poll(plots, questions)
+    union = timeit(lambda: UnionPollSchema.parse_obj(data), number=number)
+    discriminated = timeit(lambda: PollSchema.parse_obj(data), number=number)
+
+    print(
+        f"{plots} plots x {questions} questions: "
+        f"union {union / number * 1000:.2f} ms, "
+        f"discriminated {discriminated / number * 1000:.2f} ms, "
+        f"speedup x{union / discriminated:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    bench(12, 5, 50)
+    bench(60, 10, 10)
+    bench(120, 25, 3)
@@ -0,0 +1,45 @@
+from timeit import timeit
+
+import models
+from handlers.poll import (
+    get_selector_buttons,
+    question_text,
+    render_question_text,
+    render_selector_buttons,
+)
+
+
+def bench(options: int, users: int) -> None:
+    question = models.poll.SelectorQuestion(
+        label="Question <with> markup",
+        description="Pick any",
+        options=[
+            models.poll.Option(label=f"Option {i}", image=None) for i in range(options)
+        ],
+    )
+    states = [user % (1 << options) for user in range(users)]
+
+    def uncached() -> None:
+        for selected in states:
+            render_question_text(question)
+            render_selector_buttons(question, selected)
+
+    def cached() -> None:
+        for selected in states:
+            question_text(question)
+            get_selector_buttons(question, selected)
+
+    plain = timeit(uncached, number=1)
+    cached()
+    warm = timeit(cached, number=1)
+
+    print(
+        f"{options} options x {users} users: "
+        f"render {plain * 1000:.1f} ms, cached {warm * 1000:.1f} ms, "
+        f"speedup x{plain / warm:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    bench(4, 10000)
+    bench(8, 10000)
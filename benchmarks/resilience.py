@@ -0,0 +1,97 @@
+from asyncio import gather, get_event_loop, sleep
+from time import perf_counter
+
+from aiohttp import web
+from yarl import URL
+
+import api
+import models
+from benchmarks.answers import selector_poll
+from benchmarks.backend import Backend
+from resilience import CircuitBreaker, CircuitOpen, Endpoint, LatencyTracker
+from settings import settings
+from transport import transport
+
+
+def tracker() -> LatencyTracker:
+    return LatencyTracker(200, 0.99, 3, 1, 5)
+
+
+async def get_poll(endpoint: Endpoint[models.poll.Poll]) -> float:
+    url = str((URL(settings.api_url) / "polls/get").with_query({"poll_id": 1}))
+
+    async def request() -> models.poll.Poll:
+        async with transport.client.get(url) as response:
+            if response.status != 200:
+                raise api.HTTPException(response.status, await response.text())
+            return models.poll.Poll.parse_raw(await response.text())
+
+    start = perf_counter()
+    await endpoint.call(request)
+    return perf_counter() - start
+
+
+async def tail(backend: Backend, name: str, hedge: float | None, calls: int) -> None:
+    endpoint: Endpoint[models.poll.Poll] = Endpoint(
+        tracker(), CircuitBreaker(5, 1), hedge, api.transient
+    )
+    latencies = []
+    for _ in range(calls):
+        latencies.extend(await gather(*(get_poll(endpoint) for _ in range(10))))
+    latencies.sort()
+
+    print(
+        f"{name}: p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms, "
+        f"max {latencies[-1] * 1000:.0f} ms, {endpoint.hedged} hedged"
+    )
+
+
+async def outage(backend: Backend, calls: int) -> None:
+    endpoint: Endpoint[models.poll.Poll] = Endpoint(
+        tracker(), CircuitBreaker(5, 0.2), None, api.transient
+    )
+    backend.failing = True
+    backend.requests = 0
+    failed = fast = 0
+
+    start = perf_counter()
+    for _ in range(calls):
+        try:
+            await get_poll(endpoint)
+        except CircuitOpen:
+            fast += 1
+        except api.HTTPException:
+            failed += 1
+    elapsed = perf_counter() - start
+    print(
+        f"outage: {calls} calls in {elapsed * 1000:.0f} ms, "
+        f"{backend.requests} reached the backend, {failed} failed, "
+        f"{fast} rejected by the open circuit"
+    )
+
+    backend.failing = False
+    await sleep(0.2)
+    await get_poll(endpoint)
+    print(f"recovered: circuit closed = {endpoint.breaker.opened_at is None}")
+
+
+async def bench() -> None:
+    await transport.start()
+    backend = Backend(selector_poll(), 0.005, slow_rate=0.02, slow_latency=0.5)
+    runner = web.AppRunner(backend.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    settings.api_url = "http://127.0.0.1:%s" % runner.addresses[0][1]
+
+    await tail(backend, "plain", None, 50)
+    await tail(backend, "hedged at p90", 0.9, 50)
+    await outage(backend, 1000)
+
+    await transport.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    get_event_loop().run_until_complete(bench())
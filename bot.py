@@ -1,9 +1,49 @@
-from aiogram import Bot, Dispatcher
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from aiogram.types import ParseMode
 
+from commands import CommandScopes
+from dispatch import OrderedDispatcher
+from flood import FloodControl
+from outbound import ScheduledBot, Scheduler
+from results import LiveResults
 from settings import settings
+from storage import SQLiteStorage
 
-bot = Bot(token=settings.token, parse_mode=ParseMode.HTML)
-storage = MemoryStorage()
-dp = Dispatcher(bot, storage=storage)
+scheduler = Scheduler(
+    settings.global_rate_limit,
+    settings.chat_rate_limit,
+    settings.chat_rate_burst,
+)
+bot = ScheduledBot(
+    scheduler,
+    settings.edit_coalesce_delay,
+    settings.delete_batch_delay,
+    settings.rendered_cache_size,
+    token=settings.token,
+    parse_mode=ParseMode.HTML,
+)
+command_scopes = CommandScopes(bot, settings.command_scopes_size)
+live_results = LiveResults(
+    bot,
+    settings.live_results_interval,
+    settings.live_results_size,
+)
+storage = (
+    MemoryStorage()
+    if settings.storage_path is None
+    else SQLiteStorage(
+        settings.storage_path,
+        settings.storage_flush_interval,
+        settings.storage_batch_size,
+        settings.storage_cache_size,
+    )
+)
+dp = OrderedDispatcher(bot, storage, settings.dispatch_concurrency)
+dp.middleware.setup(
+    FloodControl(
+        settings.flood_rate,
+        settings.flood_burst,
+        settings.flood_size,
+        bot.deleter,
+    )
+)
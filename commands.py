@@ -1,7 +1,58 @@
+import logging
+from asyncio import Task, create_task
+from collections import OrderedDict
+from typing import TypeAlias
+
+from aiogram import Bot
 from aiogram.types import BotCommand as cmd
 from aiogram.types import BotCommandScopeAllPrivateChats as all_private_scope
 from aiogram.types import BotCommandScopeChat as target_scope
+from aiogram.utils.exceptions import TelegramAPIError
+
+log = logging.getLogger(__name__)
+
+Applied: TypeAlias = tuple[tuple[str, str], ...] | None
 
 global_commands = [cmd("start", "Connect to presentation")]
 code_state_commands = [cmd("cancel", "Cancel connection to presentation")]
 answers_state_commands = [cmd("exit", "Exit from presentation")]
+
+
+class CommandScopes:
+    def __init__(self, bot: Bot, size: int) -> None:
+        self.bot = bot
+        self.size = size
+        self.applied: OrderedDict[int, Applied] = OrderedDict()
+        self.tasks: set[Task[None]] = set()
+
+    def set(self, chat_id: int, commands: list[cmd] | None) -> None:
+        applied = (
+            None
+            if commands is None
+            else tuple((command.command, command.description) for command in commands)
+        )
+        if chat_id in self.applied and self.applied[chat_id] == applied:
+            self.applied.move_to_end(chat_id)
+            return
+
+        self.applied[chat_id] = applied
+        self.applied.move_to_end(chat_id)
+        if len(self.applied) > self.size:
+            self.applied.popitem(last=False)
+
+        task = create_task(self.apply(chat_id, commands))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def delete(self, chat_id: int) -> None:
+        self.set(chat_id, None)
+
+    async def apply(self, chat_id: int, commands: list[cmd] | None) -> None:
+        try:
+            if commands is None:
+                await self.bot.delete_my_commands(target_scope(chat_id))
+            else:
+                await self.bot.set_my_commands(commands, target_scope(chat_id))
+        except TelegramAPIError:
+            log.exception("Updating commands of chat %s failed", chat_id)
+            self.applied.pop(chat_id, None)
@@ -0,0 +1,90 @@
+from asyncio import Future, Semaphore, create_task, gather, get_running_loop
+from collections import deque
+from functools import partial
+from typing import Any, Awaitable, Callable, TypeAlias
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.storage import BaseStorage
+from aiogram.types import Update
+
+Call: TypeAlias = Callable[[], Awaitable[Any]]
+Lane: TypeAlias = tuple[int | None, int | None]
+
+
+def update_lane(update: Update) -> Lane:
+    for event in (
+        update.message,
+        update.edited_message,
+        update.channel_post,
+        update.edited_channel_post,
+        update.my_chat_member,
+        update.chat_member,
+        update.chat_join_request,
+    ):
+        if event is not None:
+            user = event.from_user
+            return event.chat.id, None if user is None else user.id
+
+    if update.callback_query is not None:
+        user_id = update.callback_query.from_user.id
+        if update.callback_query.message is not None:
+            return update.callback_query.message.chat.id, user_id
+        return user_id, user_id
+
+    for event in (
+        update.inline_query,
+        update.chosen_inline_result,
+        update.shipping_query,
+        update.pre_checkout_query,
+    ):
+        if event is not None:
+            return event.from_user.id, event.from_user.id
+
+    return None, None
+
+
+class OrderedDispatcher(Dispatcher):
+    def __init__(
+        self,
+        bot: Bot,
+        storage: BaseStorage,
+        concurrency: int,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(bot, storage=storage, **kwargs)
+        self.semaphore = Semaphore(concurrency)
+        self.lanes: dict[Lane, deque[tuple[Call, Future[Any]]]] = {}
+
+    async def process_updates(self, updates: list[Update], fast: bool = True) -> Any:
+        return await gather(*(self.feed(update) for update in updates))
+
+    def feed(self, update: Update) -> Future[Any]:
+        return self.run_in_lane(
+            update_lane(update),
+            partial(self.updates_handler.notify, update),
+        )
+
+    def run_in_lane(self, lane: Lane, call: Call) -> Future[Any]:
+        future: Future[Any] = get_running_loop().create_future()
+
+        if lane not in self.lanes:
+            self.lanes[lane] = deque()
+            create_task(self.lane_worker(lane))
+        self.lanes[lane].append((call, future))
+
+        return future
+
+    async def lane_worker(self, lane: Lane) -> None:
+        queue = self.lanes[lane]
+
+        while len(queue) > 0:
+            call, future = queue.popleft()
+            try:
+                async with self.semaphore:
+                    result = await call()
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+        del self.lanes[lane]
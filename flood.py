@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from typing import Any
+
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.types import CallbackQuery, ChatType, Message
+
+from outbound import DeleteBatcher, TokenBucket
+from states import AnswersState
+
+
+class FloodControl(BaseMiddleware):
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        size: int,
+        deleter: DeleteBatcher,
+    ) -> None:
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.size = size
+        self.deleter = deleter
+        self.buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+        self.notified: set[int] = set()
+        self.dropped = 0
+
+    def allow(self, user_id: int) -> bool:
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            bucket = self.buckets[user_id] = TokenBucket(self.rate, self.burst)
+            while len(self.buckets) > self.size:
+                evicted, _ = self.buckets.popitem(last=False)
+                self.notified.discard(evicted)
+        self.buckets.move_to_end(user_id)
+
+        if bucket.take():
+            self.notified.discard(user_id)
+            return True
+
+        self.dropped += 1
+        return False
+
+    def notify(self, user_id: int) -> bool:
+        if user_id in self.notified:
+            return False
+        self.notified.add(user_id)
+        return True
+
+    async def on_pre_process_message(
+        self,
+        message: Message,
+        data: dict[str, Any],
+    ) -> None:
+        if message.from_user is None or self.allow(message.from_user.id):
+            return
+
+        if message.chat.type == ChatType.PRIVATE:
+            state = self.manager.dispatcher.current_state(
+                chat=message.chat.id, user=message.from_user.id
+            )
+            if await state.get_state() in AnswersState.all_states_names:
+                self.deleter.delete(message.chat.id, message.message_id)
+        raise CancelHandler()
+
+    async def on_pre_process_callback_query(
+        self,
+        query: CallbackQuery,
+        data: dict[str, Any],
+    ) -> None:
+        if self.allow(query.from_user.id):
+            return
+
+        if self.notify(query.from_user.id):
+            await query.answer("Too many requests, slow down.")
+        raise CancelHandler()
@@ -1,2 +1,3 @@
 from . import start
 from . import poll
+from . import group
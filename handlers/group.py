@@ -0,0 +1,317 @@
+import logging
+from asyncio import Task, TimeoutError, create_task, sleep
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from aiogram.dispatcher.filters import Command
+from aiogram.types import (
+    CallbackQuery,
+    ChatType,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+)
+from aiogram.utils.callback_data import CallbackData
+from aiogram.utils.exceptions import TelegramAPIError
+from aiohttp import ClientError
+
+import api
+import models
+from bot import bot, dp, live_results
+from handlers.poll import question_text
+from outbound import Priority, prioritized
+from outbox import outbox
+from render import dump
+from resilience import CircuitOpen
+from settings import settings
+
+log = logging.getLogger(__name__)
+
+group_chats = [ChatType.GROUP, ChatType.SUPERGROUP]
+group_callback_data = CallbackData("group", "action")
+
+
+@dataclass
+class SharedQuestion:
+    question: models.poll.Question
+    message_id: int
+    selections: dict[int, int] = field(default_factory=dict)
+    answered: set[int] = field(default_factory=set)
+    counts: list[int] = field(default_factory=list)
+    task: Task[None] | None = None
+
+
+@dataclass
+class Presentation:
+    poll_id: int
+    chat_id: int
+    owner_id: int | None
+    questions: OrderedDict[int, SharedQuestion] = field(default_factory=OrderedDict)
+    posted: set[UUID] = field(default_factory=set)
+    ready: bool = False
+    pending: models.poll.Question | None = None
+
+
+presentations: dict[int, Presentation] = {}
+
+
+def shared_text(shared: SharedQuestion) -> str:
+    return (
+        f"{question_text(shared.question).rstrip()}\n\n"
+        f"Answers: {len(shared.answered)}"
+    )
+
+
+def shared_buttons(shared: SharedQuestion) -> str:
+    question = shared.question
+    buttons = InlineKeyboardMarkup()
+    assert isinstance(question, models.poll.SelectorQuestion)
+
+    for index, option in enumerate(question.options):
+        label = option.label
+        if not question.hide_results:
+            label = f"{label} — {shared.counts[index]}"
+        buttons.row(
+            InlineKeyboardButton(
+                label,
+                callback_data=group_callback_data.new(action=index),
+            )
+        )
+    buttons.row(
+        InlineKeyboardButton(
+            "Send",
+            callback_data=group_callback_data.new(action="send"),
+        )
+    )
+
+    return dump(buttons)
+
+
+async def private_buttons(poll_id: int) -> str:
+    me = await bot.me
+    return dump(
+        InlineKeyboardMarkup().row(
+            InlineKeyboardButton(
+                "Answer in private chat",
+                url=f"https://t.me/{me.username}?start={poll_id}",
+            )
+        )
+    )
+
+
+async def post_question(
+    presentation: Presentation,
+    question: models.poll.Question,
+) -> None:
+    shared = SharedQuestion(question, 0)
+
+    with prioritized(Priority.question):
+        if isinstance(question, models.poll.SelectorQuestion):
+            shared.counts = [0] * len(question.options)
+            message = await bot.send_message(
+                presentation.chat_id,
+                shared_text(shared),
+                reply_markup=shared_buttons(shared),
+            )
+        else:
+            message = await bot.send_message(
+                presentation.chat_id,
+                question_text(question),
+                reply_markup=await private_buttons(presentation.poll_id),
+            )
+
+    shared.message_id = message.message_id
+    presentation.questions[shared.message_id] = shared
+    while len(presentation.questions) > settings.group_history_size:
+        _, dropped = presentation.questions.popitem(last=False)
+        if dropped.task is not None:
+            dropped.task.cancel()
+
+
+def schedule_refresh(presentation: Presentation, shared: SharedQuestion) -> None:
+    if shared.task is None:
+        shared.task = create_task(refresh(presentation, shared))
+
+
+async def refresh(presentation: Presentation, shared: SharedQuestion) -> None:
+    await sleep(settings.group_refresh_interval)
+    shared.task = None
+
+    try:
+        await bot.edit_message_text(
+            shared_text(shared),
+            presentation.chat_id,
+            shared.message_id,
+            reply_markup=shared_buttons(shared),
+        )
+    except TelegramAPIError:
+        log.exception("Refreshing shared question %s failed", shared.message_id)
+
+
+async def start_presentation(
+    chat_id: int,
+    owner_id: int | None,
+    args: str,
+    msg: Message,
+) -> None:
+    try:
+        poll_id = int(args)
+    except ValueError:
+        await msg.reply("Send /present with the connection code of the presentation.")
+        return
+
+    try:
+        await api.polls.get(poll_id)
+    except api.HTTPException as exc:
+        if exc.args[0] == 404:
+            await msg.reply("Presentation with this connection code was not found.")
+            return
+        log.warning("Poll %s is unavailable", poll_id, exc_info=exc)
+    except (CircuitOpen, TimeoutError, ClientError) as exc:
+        log.warning("Poll %s is unavailable", poll_id, exc_info=exc)
+
+    if chat_id in presentations:
+        await stop_presentation(chat_id)
+
+    presentation = presentations[chat_id] = Presentation(poll_id, chat_id, owner_id)
+
+    async def on_message(question: models.poll.Question) -> None:
+        if question.question_id in presentation.posted:
+            return
+        presentation.posted.add(question.question_id)
+
+        if presentation.ready:
+            await post_question(presentation, question)
+        else:
+            presentation.pending = question
+
+    await msg.reply(
+        "The presentation is connected, questions will appear in this chat."
+        " Send /stop to disconnect."
+    )
+    await api.questions_hub.subscribe(poll_id, chat_id, on_message)
+
+    presentation.ready = True
+    if presentation.pending is not None:
+        await post_question(presentation, presentation.pending)
+        presentation.pending = None
+
+
+async def stop_presentation(chat_id: int) -> None:
+    presentation = presentations.pop(chat_id)
+    for shared in presentation.questions.values():
+        if shared.task is not None:
+            shared.task.cancel()
+    await api.questions_hub.unsubscribe(presentation.poll_id, chat_id)
+
+
+def is_presenter(chat_id: int, user_id: int) -> bool:
+    presentation = presentations.get(chat_id)
+    return presentation is None or presentation.owner_id in (None, user_id)
+
+
+@dp.message_handler(commands=["present"], chat_type=group_chats)
+async def present_command(msg: Message) -> None:
+    if not is_presenter(msg.chat.id, msg.from_user.id):
+        return
+
+    await start_presentation(msg.chat.id, msg.from_user.id, msg.get_args(), msg)
+
+
+@dp.channel_post_handler(Command("present"))
+async def present_channel_command(msg: Message) -> None:
+    await start_presentation(msg.chat.id, None, msg.get_args(), msg)
+
+
+@dp.message_handler(commands=["stop"], chat_type=group_chats)
+async def stop_command(msg: Message) -> None:
+    if msg.chat.id not in presentations or not is_presenter(
+        msg.chat.id, msg.from_user.id
+    ):
+        return
+
+    await stop_presentation(msg.chat.id)
+    await msg.reply("The presentation is disconnected.")
+
+
+@dp.channel_post_handler(Command("stop"))
+async def stop_channel_command(msg: Message) -> None:
+    if msg.chat.id in presentations:
+        await stop_presentation(msg.chat.id)
+        await msg.reply("The presentation is disconnected.")
+
+
+@dp.callback_query_handler(
+    group_callback_data.filter(),
+    chat_type=[*group_chats, ChatType.CHANNEL],
+)
+async def group_option_handler(
+    clb: CallbackQuery,
+    callback_data: dict[str, str],
+) -> None:
+    presentation = presentations.get(clb.message.chat.id)
+    shared = (
+        None
+        if presentation is None
+        else presentation.questions.get(clb.message.message_id)
+    )
+    if presentation is None or shared is None:
+        await clb.answer("This question is closed.")
+        return
+
+    question = shared.question
+    assert isinstance(question, models.poll.SelectorQuestion)
+    user_id = clb.from_user.id
+    if user_id in shared.answered:
+        await clb.answer("You have already answered this question.")
+        return
+
+    selected = shared.selections.get(user_id, 0)
+    max_checked = (
+        question.max_checked
+        if question.max_checked is not None
+        else len(question.options)
+    )
+
+    if callback_data["action"] == "send":
+        if not question.min_checked <= selected.bit_count() <= max_checked:
+            await clb.answer(f"Select from {question.min_checked} to {max_checked}.")
+            return
+
+        value = models.answers.SelectorValue(
+            question_id=question.question_id,
+            selected={
+                index for index in range(len(question.options)) if selected >> index & 1
+            },
+        )
+        outbox.submit(presentation.poll_id, value)
+        live_results.record(question, value)
+
+        shared.selections.pop(user_id, None)
+        shared.answered.add(user_id)
+        for index in value.selected:
+            shared.counts[index] += 1
+        schedule_refresh(presentation, shared)
+
+        await clb.answer("Thanks for the answer!")
+        return
+
+    index = int(callback_data["action"])
+    if max_checked == 1:
+        selected = 0 if selected == 1 << index else 1 << index
+    else:
+        selected ^= 1 << index
+        if selected.bit_count() > max_checked:
+            await clb.answer(f"You can select at most {max_checked}.")
+            return
+    shared.selections[user_id] = selected
+
+    labels = [
+        option.label
+        for index, option in enumerate(question.options)
+        if selected >> index & 1
+    ]
+    await clb.answer(
+        f"Selected: {', '.join(labels)}" if len(labels) > 0 else "Nothing selected"
+    )
@@ -1,7 +1,9 @@
-from asyncio import Queue, Task
+import logging
+from asyncio import Task, TimeoutError, create_task, current_task
+from functools import partial
 from html import escape
-from json import loads
-from uuid import UUID
+from math import ceil
+from typing import TypeVar
 
 from aiogram.dispatcher import FSMContext
 from aiogram.types import (
@@ -12,59 +14,130 @@ from aiogram.types import (
     Message,
 )
 from aiogram.utils.callback_data import CallbackData
+from aiogram.utils.exceptions import TelegramAPIError
+from aiohttp import ClientError
 
 import api
 import models
-from bot import bot, dp
-from commands import answers_state_commands, target_scope
+from bot import bot, command_scopes, dp, live_results
+from commands import answers_state_commands
+from outbound import Priority, prioritized
+from outbox import outbox
+from questions import QuestionQueue
+from reaper import ActivityMiddleware, SessionReaper
+from render import dump, renders
+from resilience import CircuitOpen
+from session import Session
+from settings import QueuePolicy, settings
 from states import AnswersState
+from storage import SQLiteStorage
+
+log = logging.getLogger(__name__)
+
+Q = TypeVar("Q", bound=models.poll.BaseQuestion)
 
 option_callback_data = CallbackData("option", "index")
+slide_callback_data = CallbackData("slide", "index", "value")
 change_question_callback_data = CallbackData("change", "action")
 exit_callback_data = CallbackData("exit")
 cancel_callback_data = CallbackData("cancel")
 
 delete_callback_data = CallbackData("delete", "index")
-add_callback_data = CallbackData("add")
+move_callback_data = CallbackData("move", "index", "offset")
 send_callback_data = CallbackData("send")
 
-change_question_buttons = InlineKeyboardMarkup().row(
-    InlineKeyboardButton(
-        "Stay on the current question",
-        callback_data=change_question_callback_data.new(action="cancel"),
-    ),
-    InlineKeyboardButton(
-        "Go to next question",
-        callback_data=change_question_callback_data.new(action="accept"),
-    ),
-)
-exit_buttons = InlineKeyboardMarkup().row(
-    InlineKeyboardButton(
-        "Exit from presentation",
-        callback_data=exit_callback_data.new(),
+change_question_buttons = dump(
+    InlineKeyboardMarkup().row(
+        InlineKeyboardButton(
+            "Stay on the current question",
+            callback_data=change_question_callback_data.new(action="cancel"),
+        ),
+        InlineKeyboardButton(
+            "Go to next question",
+            callback_data=change_question_callback_data.new(action="accept"),
+        ),
     )
 )
-cancel_buttons = InlineKeyboardMarkup().row(
-    InlineKeyboardButton(
-        "Cancel",
-        callback_data=cancel_callback_data.new(),
+exit_buttons = dump(
+    InlineKeyboardMarkup().row(
+        InlineKeyboardButton(
+            "Exit from presentation",
+            callback_data=exit_callback_data.new(),
+        )
     )
 )
 
-add_button = InlineKeyboardButton(
-    "+",
-    callback_data=add_callback_data.new(),
+cancel_button = InlineKeyboardButton(
+    "Cancel",
+    callback_data=cancel_callback_data.new(),
 )
 send_button = InlineKeyboardButton(
     "Send",
     callback_data=send_callback_data.new(),
 )
 
-questions_pull: dict[int, tuple[Queue[models.poll.Question], Task[None]]] = {}
+cancel_buttons = dump(InlineKeyboardMarkup().row(cancel_button))
+send_buttons = dump(InlineKeyboardMarkup().row(send_button))
+
+questions_pull: dict[int, tuple[QuestionQueue, Task[None] | None]] = {}
+
+
+async def get_question(session: Session, question_type: type[Q]) -> Q:
+    assert session.question_id is not None
+    question = api.questions_hub.question(session.poll_id, session.question_id)
+    if question is None:
+        question = await api.polls.question(session.poll_id, session.question_id)
+    assert isinstance(question, question_type)
+    return question
+
+
+async def edit_message(
+    session: Session,
+    text: str,
+    reply_markup: str | None = None,
+) -> None:
+    await bot.edit_message_text(
+        text,
+        session.chat_id,
+        session.message_id,
+        reply_markup=reply_markup,
+    )
+
 
+async def subscribe_answers_state(
+    poll_id: int,
+    user_id: int,
+    state: FSMContext,
+) -> QuestionQueue:
+    async def on_message(question: models.poll.Question) -> None:
+        async with state.proxy() as proxy:
+            session: Session = proxy["session"]
 
-class QuestionModel(models.BaseModel):
-    data: models.poll.Question
+            if question.question_id in session.completed:
+                return
+
+            session.completed.add(question.question_id)
+
+            if session.question_id is None:
+                queue.put(question)
+            elif session.question_id != question.question_id:
+                changed = queue.put(question)
+                if queue.policy == QueuePolicy.keep_only_current:
+                    if user_id in questions_pull:
+                        schedule_next_question(user_id, state)
+                elif changed and session.dialog_id is None:
+                    with prioritized(Priority.question):
+                        dialog = await bot.send_message(
+                            session.chat_id,
+                            "The question queue was changed.",
+                            reply_to_message_id=session.message_id,
+                            reply_markup=change_question_buttons,
+                        )
+                    session.dialog_id = dialog.message_id
+
+    queue = QuestionQueue(settings.question_queue_policy, settings.question_queue_size)
+    await api.questions_hub.subscribe(poll_id, user_id, on_message)
+    return queue
 
 
 async def start_answers_state(
@@ -72,87 +145,174 @@ async def start_answers_state(
     msg: Message,
     state: FSMContext,
 ) -> None:
-    async def on_message(data: str | bytes) -> None:
-        question = QuestionModel(data=loads(data)).data
-        async with state.proxy() as proxy:
-            current_question: models.poll.Question | None = proxy.get("question", None)
-            completed: set[UUID] = proxy.get("completed", set())
+    title = ""
+    try:
+        title = f" <b>{escape((await api.polls.get(poll_id)).poll.name)}</b>"
+    except api.HTTPException as exc:
+        if exc.args[0] == 404:
+            await msg.reply(
+                "Presentation with this connection code was not found.\n"
+                "Try again or type /cancel to cancel connection."
+            )
+            return
+        log.warning("Poll %s is unavailable", poll_id, exc_info=exc)
+    except (CircuitOpen, TimeoutError, ClientError) as exc:
+        log.warning("Poll %s is unavailable", poll_id, exc_info=exc)
+
+    message = await msg.answer(
+        f"You are connected to the presentation{title},"
+        " please wait for the new questions. Type /exit to exit.",
+        reply_markup=exit_buttons,
+    )
+    async with state.proxy() as data:
+        data["session"] = Session(poll_id, message.chat.id, message.message_id)
+
+    queue = await subscribe_answers_state(poll_id, msg.from_user.id, state)
+    command_scopes.set(msg.from_user.id, answers_state_commands)
+    reaper.add(msg.chat.id, msg.from_user.id)
+    questions_pull[msg.from_user.id] = (
+        queue,
+        spawn_next_question(msg.from_user.id, queue, state),
+    )
 
-            if question.question_id in completed:
-                return
 
-            completed.add(question.question_id)
+async def restore_answers_states() -> None:
+    if not isinstance(dp.storage, SQLiteStorage):
+        return
+
+    for chat_id, user_id in await dp.storage.states(AnswersState.__full_group_name__):
+        state = dp.current_state(chat=int(chat_id), user=int(user_id))
+        stale = await state.get_state() not in AnswersState.all_states_names
+        async with state.proxy() as data:
+            session: Session = data["session"]
+            if stale:
+                session.question_id = None
+
+        queue = await subscribe_answers_state(session.poll_id, int(user_id), state)
+        reaper.add(int(chat_id), int(user_id))
+        questions_pull[int(user_id)] = (
+            queue,
+            (
+                spawn_next_question(int(user_id), queue, state)
+                if session.question_id is None
+                else None
+            ),
+        )
 
-            if current_question is None:
-                await queue.put(question)
-            elif current_question.question_id != question.question_id:
-                await queue.put(question)
-                if proxy["dialog"] is None:
-                    proxy["dialog"] = await msg.reply(
-                        "The question queue was changed.",
-                        reply_markup=change_question_buttons,
-                    )
-            proxy["completed"] = completed
 
-    queue: Queue[models.poll.Question] = Queue()
-    task = await api.listen_questions(poll_id, on_message)
-    questions_pull[msg.from_user.id] = (queue, task)
+async def stop_answers_state(
+    user_id: int,
+    state: FSMContext,
+    reason: str = "You are disconnected from the presentation.",
+) -> None:
+    live_results.unwatch(user_id)
+    _, task = questions_pull.pop(user_id, (None, None))
+    if task is not None:
+        task.cancel()
 
     async with state.proxy() as data:
-        data["poll_id"] = poll_id
-        data["completed"] = set()
-        data["question"] = None
-        data["dialog"] = None
-        data["message"] = await msg.answer(
-            "You are connected to the presentation, please wait for the new questions. Type /exit to exit.",
-            reply_markup=exit_buttons,
+        session: Session = data["session"]
+    reaper.forget(session.chat_id, user_id)
+
+    try:
+        await edit_message(
+            session,
+            f"{reason} To connect again scan the QR code from the presentation"
+            " or enter /start and enter the connection code.",
         )
+    except TelegramAPIError:
+        log.exception("Disconnect notice for user %s failed", user_id)
+
+    await api.questions_hub.unsubscribe(session.poll_id, user_id)
+    command_scopes.delete(user_id)
+    await state.finish()
 
-    await bot.set_my_commands(answers_state_commands, target_scope(msg.from_user.id))
-    await wait_next_question(msg, queue, state)
 
+async def evict_answers_state(chat_id: int, user_id: int) -> None:
+    state = dp.current_state(chat=chat_id, user=user_id)
+    if await state.get_state() is None:
+        questions_pull.pop(user_id, None)
+        return
 
-async def stop_answers_state(user_id: int, state: FSMContext) -> None:
-    task = questions_pull.pop(user_id)[1]
+    await stop_answers_state(
+        user_id,
+        state,
+        "You were disconnected from the presentation due to inactivity.",
+    )
 
-    async with state.proxy() as data:
-        await data["message"].edit_text(
-            "You are disconnected from the presentation."
-            " To connect again scan the QR code from the presentation or enter /start and enter the connection code."
+
+async def evict_in_lane(chat_id: int, user_id: int) -> None:
+    await dp.run_in_lane(
+        (chat_id, user_id), partial(evict_answers_state, chat_id, user_id)
+    )
+
+
+reaper = SessionReaper(
+    settings.session_idle_ttl,
+    settings.session_limit,
+    settings.session_reap_interval,
+    evict_in_lane,
+)
+dp.middleware.setup(ActivityMiddleware(reaper))
+
+
+def schedule_next_question(user_id: int, state: FSMContext) -> None:
+    queue, task = questions_pull[user_id]
+    if task is not None and task is not current_task():
+        task.cancel()
+    questions_pull[user_id] = (
+        queue,
+        spawn_next_question(user_id, queue, state),
+    )
+
+
+def log_wait_failure(user_id: int, task: Task[None]) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.error(
+            "Waiting for the next question of user %s failed",
+            user_id,
+            exc_info=task.exception(),
         )
 
-    task.cancel()
-    await task
-    await bot.delete_my_commands(target_scope(user_id))
-    await state.finish()
+
+def spawn_next_question(
+    user_id: int,
+    queue: QuestionQueue,
+    state: FSMContext,
+) -> Task[None]:
+    task = create_task(wait_next_question(queue, state))
+    task.add_done_callback(partial(log_wait_failure, user_id))
+    return task
 
 
 async def wait_next_question(
-    msg: Message,
-    queue: Queue[models.poll.Question],
+    queue: QuestionQueue,
     state: FSMContext,
 ) -> None:
-    await AnswersState.wait_question.set()
+    await state.set_state(AnswersState.wait_question)
 
     question = await queue.get()
 
     async with state.proxy() as data:
-        if data["dialog"] is not None:
-            await data["dialog"].delete()
-            data["dialog"] = None
-        data["question"] = question
-
-    if isinstance(question, models.poll.SelectorQuestion):
-        await start_selector_answer(msg, question, state)
-    if isinstance(question, models.poll.SliderQuestion):
-        await start_slider_answer(msg, question, state)
-    if isinstance(question, models.poll.TopListQuestion):
-        await start_top_list_answer(msg, question, state)
-    if isinstance(question, models.poll.TextQuestion):
-        await start_text_answer(msg, question, state)
+        session: Session = data["session"]
+        live_results.unwatch(session.chat_id)
+        if session.dialog_id is not None:
+            bot.deleter.delete(session.chat_id, session.dialog_id)
+            session.dialog_id = None
+        session.question_id = question.question_id
+
+    with prioritized(Priority.question):
+        if isinstance(question, models.poll.SelectorQuestion):
+            await start_selector_answer(question, state)
+        if isinstance(question, models.poll.SliderQuestion):
+            await start_slider_answer(question, state)
+        if isinstance(question, models.poll.TopListQuestion):
+            await start_top_list_answer(question, state)
+        if isinstance(question, models.poll.TextQuestion):
+            await start_text_answer(question, state)
 
 
-def question_text(question: models.poll.Question) -> str:
+def render_question_text(question: models.poll.Question) -> str:
     if question.description is not None:
         return (
             f"<b>{escape(question.label)}</b>\n\n"
@@ -162,11 +322,19 @@ def question_text(question: models.poll.Question) -> str:
         return f"<b>{escape(question.label)}</b>\n"
 
 
-def get_selector_buttons(
+def question_text(question: models.poll.Question) -> str:
+    return renders.get(
+        ("text", question.question_id, question.fingerprint),
+        partial(render_question_text, question),
+    )
+
+
+def render_selector_buttons(
     question: models.poll.SelectorQuestion,
-    selected: set[int],
-) -> InlineKeyboardMarkup:
+    selected: int,
+) -> str:
     buttons = InlineKeyboardMarkup()
+    selected_count = selected.bit_count()
     max_checked = (
         question.max_checked
         if question.max_checked is not None
@@ -174,44 +342,65 @@ def get_selector_buttons(
     )
 
     for index, option in enumerate(question.options):
-        if len(selected) == max_checked and index not in selected:
+        is_selected = selected >> index & 1 == 1
+        if selected_count == max_checked and not is_selected:
             continue
 
         buttons.row(
             InlineKeyboardButton(
-                f"{'●' if index in selected else '○'} {option.label}",
+                f"{'●' if is_selected else '○'} {option.label}",
                 callback_data=option_callback_data.new(index=index),
             )
         )
 
-    if question.min_checked <= len(selected) <= max_checked:
+    if question.min_checked <= selected_count <= max_checked:
         buttons.row(send_button)
 
-    return buttons
+    return dump(buttons)
+
+
+def get_selector_buttons(
+    question: models.poll.SelectorQuestion,
+    selected: int,
+) -> str:
+    return renders.get(
+        ("selector", question.question_id, question.fingerprint, selected),
+        partial(render_selector_buttons, question, selected),
+    )
 
 
 async def start_selector_answer(
-    msg: Message,
     question: models.poll.SelectorQuestion,
     state: FSMContext,
 ) -> None:
-    await AnswersState.selector.set()
-
-    selected: set[int] = set()
     async with state.proxy() as data:
-        await data["message"].edit_text(
-            question_text(question),
-            reply_markup=get_selector_buttons(question, selected),
-        )
+        session: Session = data["session"]
+        session.selected = 0
+
+    await state.set_state(AnswersState.selector)
+    await edit_message(
+        session,
+        question_text(question),
+        reply_markup=get_selector_buttons(question, session.selected),
+    )
 
-        data["selected"] = selected
 
+def slider_grid(question: models.poll.SliderQuestion) -> list[int] | None:
+    values = list(range(question.min_value, question.max_value + 1))
+    if (
+        len(values) > settings.slider_grid_values
+        or len(question.options) * (len(values) + 1) + 1 > 100
+    ):
+        return None
+    return values
 
-def get_slider_buttons(
+
+def render_slider_buttons(
     question: models.poll.SliderQuestion,
-    sliders: list[int | None],
-) -> InlineKeyboardMarkup:
+    sliders: tuple[int | None, ...],
+) -> str:
     buttons = InlineKeyboardMarkup()
+    grid = slider_grid(question)
 
     for index, (option, value) in enumerate(zip(question.options, sliders)):
         buttons.row(
@@ -220,109 +409,155 @@ def get_slider_buttons(
                 callback_data=option_callback_data.new(index=index),
             )
         )
+        if grid is None:
+            continue
+
+        width = ceil(len(grid) / ceil(len(grid) / 8))
+        for start in range(0, len(grid), width):
+            buttons.row(
+                *(
+                    InlineKeyboardButton(
+                        f"[{step}]" if step == value else str(step),
+                        callback_data=slide_callback_data.new(index=index, value=step),
+                    )
+                    for step in grid[start : start + width]
+                )
+            )
 
     if all(value is not None for value in sliders):
         buttons.row(send_button)
 
-    return buttons
+    return dump(buttons)
+
+
+def get_slider_buttons(
+    question: models.poll.SliderQuestion,
+    sliders: list[int | None],
+) -> str:
+    key = tuple(sliders)
+    return renders.get(
+        ("slider", question.question_id, question.fingerprint, key),
+        partial(render_slider_buttons, question, key),
+    )
 
 
 async def start_slider_answer(
-    msg: Message,
     question: models.poll.SliderQuestion,
     state: FSMContext,
 ) -> None:
-    await AnswersState.slider.set()
-
-    sliders: list[int | None] = [None] * len(question.options)
     async with state.proxy() as data:
-        await data["message"].edit_text(
-            question_text(question),
-            reply_markup=get_slider_buttons(question, sliders),
-        )
-
-        data["sliders"] = sliders
+        session: Session = data["session"]
+        session.sliders = [None] * len(question.options)
+
+    await state.set_state(AnswersState.slider)
+    await edit_message(
+        session,
+        question_text(question),
+        reply_markup=get_slider_buttons(question, session.sliders),
+    )
 
 
-def get_top_list_buttons(
+def render_top_list_buttons(
     question: models.poll.TopListQuestion,
-    ranks: list[int],
-) -> InlineKeyboardMarkup:
+    ranks: tuple[int, ...],
+) -> str:
     buttons = InlineKeyboardMarkup()
 
     for index, option_index in enumerate(ranks):
-        option = question.options[option_index]
-        buttons.row(
+        row = [
             InlineKeyboardButton(
-                f"{index+1} - {option.label}",
-                callback_data=option_callback_data.new(index=index),
-            ),
-            InlineKeyboardButton(
-                "Remove",
+                f"{index+1} - {question.options[option_index].label} ✕",
                 callback_data=delete_callback_data.new(index=index),
-            ),
-        )
+            )
+        ]
+        if index > 0:
+            row.append(
+                InlineKeyboardButton(
+                    "↑",
+                    callback_data=move_callback_data.new(index=index, offset=-1),
+                )
+            )
+        if index < len(ranks) - 1:
+            row.append(
+                InlineKeyboardButton(
+                    "↓",
+                    callback_data=move_callback_data.new(index=index, offset=1),
+                )
+            )
+        buttons.row(*row)
 
     max_ranks = (
         question.max_ranks if question.max_ranks is not None else len(question.options)
     )
 
     if len(ranks) < max_ranks:
-        buttons.row(add_button)
+        for index, option in enumerate(question.options):
+            if index not in ranks:
+                buttons.row(
+                    InlineKeyboardButton(
+                        option.label,
+                        callback_data=option_callback_data.new(index=index),
+                    )
+                )
     if question.min_ranks <= len(ranks) <= max_ranks:
         buttons.row(send_button)
 
-    return buttons
+    return dump(buttons)
 
 
-def get_top_list_options(
+def get_top_list_buttons(
     question: models.poll.TopListQuestion,
     ranks: list[int],
-) -> InlineKeyboardMarkup:
-    buttons = InlineKeyboardMarkup()
+) -> str:
+    key = tuple(ranks)
+    return renders.get(
+        ("top_list", question.question_id, question.fingerprint, key),
+        partial(render_top_list_buttons, question, key),
+    )
 
-    for index, option in enumerate(question.options):
-        if index in ranks:
-            continue
 
-        buttons.row(
-            InlineKeyboardButton(
-                option.label,
-                callback_data=option_callback_data.new(index=index),
-            )
-        )
+def warm_question(question: models.poll.Question) -> None:
+    question_text(question)
+    if isinstance(question, models.poll.SelectorQuestion):
+        get_selector_buttons(question, 0)
+    elif isinstance(question, models.poll.SliderQuestion):
+        get_slider_buttons(question, [None] * len(question.options))
+    elif isinstance(question, models.poll.TopListQuestion):
+        get_top_list_buttons(question, [])
+
 
-    return buttons
+api.questions_hub.on_question.append(warm_question)
 
 
 async def start_top_list_answer(
-    msg: Message,
     question: models.poll.TopListQuestion,
     state: FSMContext,
 ) -> None:
-    await AnswersState.top_list.set()
-
-    ranks: list[int] = []
     async with state.proxy() as data:
-        await data["message"].edit_text(
-            question_text(question),
-            reply_markup=get_top_list_buttons(question, ranks),
-        )
-
-        data["ranks"] = ranks
+        session: Session = data["session"]
+        session.ranks = []
+
+    await state.set_state(AnswersState.top_list)
+    await edit_message(
+        session,
+        question_text(question),
+        reply_markup=get_top_list_buttons(question, session.ranks),
+    )
 
 
 async def start_text_answer(
-    msg: Message,
     question: models.poll.TextQuestion,
     state: FSMContext,
 ) -> None:
-    await AnswersState.text.set()
-
     async with state.proxy() as data:
-        await data["message"].edit_text(
-            f"{question_text(question)}\n\nSend a message to reply."
-        )
+        session: Session = data["session"]
+        session.text = None
+
+    await state.set_state(AnswersState.text)
+    await edit_message(
+        session,
+        f"{question_text(question)}\n\nSend a message to reply.",
+    )
 
 
 @dp.callback_query_handler(change_question_callback_data.filter(), state=AnswersState)
@@ -334,15 +569,13 @@ async def change_question_handler(
     await clb.message.delete()
 
     async with state.proxy() as data:
-        data["dialog"] = None
-        data["completed"].remove(data["question"].question_id)
+        session: Session = data["session"]
+        session.dialog_id = None
+        if session.question_id is not None:
+            session.completed.discard(session.question_id)
 
     if callback_data["action"] == "accept":
-        await wait_next_question(
-            clb.message,
-            questions_pull[clb.from_user.id][0],
-            state,
-        )
+        schedule_next_question(clb.from_user.id, state)
 
     await clb.answer()
 
@@ -361,45 +594,53 @@ async def exit_handler(clb: CallbackQuery, state: FSMContext) -> None:
 
 @dp.callback_query_handler(send_callback_data.filter(), state=AnswersState)
 async def send_handler(clb: CallbackQuery, state: FSMContext) -> None:
-    await clb.message.edit_text("Sending ...")
-
     async with state.proxy() as data:
         value: models.answers.Value
-        question: models.poll.Question = data["question"]
-        poll_id: int = data["poll_id"]
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.BaseQuestion)
 
         if isinstance(question, models.poll.SelectorQuestion):
             value = models.answers.SelectorValue(
                 question_id=question.question_id,
-                selected=data.pop("selected"),
+                selected=session.selected_indexes,
             )
         elif isinstance(question, models.poll.SliderQuestion):
             value = models.answers.SliderValue(
                 question_id=question.question_id,
-                sliders=data.pop("sliders"),
+                sliders=session.sliders,
             )
         elif isinstance(question, models.poll.TopListQuestion):
             value = models.answers.TopListValue(
                 question_id=question.question_id,
-                ranks=data.pop("ranks"),
+                ranks=session.ranks,
             )
         elif isinstance(question, models.poll.TextQuestion):
             value = models.answers.TextValue(
                 question_id=question.question_id,
-                text=data.pop("text"),
+                text=session.text,
             )
 
-        await api.answers_add_value(poll_id, value)
+        outbox.submit(session.poll_id, value)
+        live_results.record(question, value)
 
-        data["question"] = None
+        session.reset_answer()
 
-    await clb.message.edit_text(
+    text = (
         "Thanks for the answer, please wait for the next questions.\n"
         "If the presentation was stopped type /exit."
     )
+    if not question.hide_results:
+        text = live_results.watch(
+            question,
+            clb.from_user.id,
+            session.chat_id,
+            session.message_id,
+            text,
+        )
+    await clb.message.edit_text(text)
     await clb.answer()
 
-    await wait_next_question(clb.message, questions_pull[clb.from_user.id][0], state)
+    schedule_next_question(clb.from_user.id, state)
 
 
 @dp.callback_query_handler(option_callback_data.filter(), state=AnswersState.selector)
@@ -410,18 +651,16 @@ async def selector_option_handler(
 ) -> None:
     index = int(callback_data["index"])
     async with state.proxy() as data:
-        selected: set[int] = data["selected"]
-
-        if index not in selected:
-            selected.add(index)
-        else:
-            selected.remove(index)
+        session: Session = data["session"]
+        session.toggle(index)
 
-        await clb.message.edit_reply_markup(
+        bot.coalescer.edit_reply_markup(
+            session.chat_id,
+            session.message_id,
             get_selector_buttons(
-                data["question"],
-                selected,
-            )
+                await get_question(session, models.poll.SelectorQuestion),
+                session.selected,
+            ),
         )
     await clb.answer()
 
@@ -436,8 +675,9 @@ async def slider_option_handler(
 
     index = int(callback_data["index"])
     async with state.proxy() as data:
-        question: models.poll.SliderQuestion = data["question"]
-        data["index"] = index
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.SliderQuestion)
+        session.index = index
 
         await clb.message.edit_text(
             f'Send me the value for "{question.options[index].label}".\n'
@@ -448,6 +688,33 @@ async def slider_option_handler(
     await clb.answer()
 
 
+@dp.callback_query_handler(slide_callback_data.filter(), state=AnswersState.slider)
+async def slide_handler(
+    clb: CallbackQuery,
+    state: FSMContext,
+    callback_data: dict[str, str],
+) -> None:
+    index, value = int(callback_data["index"]), int(callback_data["value"])
+    async with state.proxy() as data:
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.SliderQuestion)
+
+        if not (
+            0 <= index < len(session.sliders)
+            and question.min_value <= value <= question.max_value
+        ):
+            await clb.answer()
+            return
+        session.sliders[index] = value
+
+        bot.coalescer.edit_reply_markup(
+            session.chat_id,
+            session.message_id,
+            get_slider_buttons(question, session.sliders),
+        )
+    await clb.answer()
+
+
 @dp.callback_query_handler(
     cancel_callback_data.filter(),
     state=AnswersState.wait_slider_value,
@@ -460,12 +727,14 @@ async def cancel_slider_value_handler(
     await AnswersState.slider.set()
 
     async with state.proxy() as data:
-        question: models.poll.SliderQuestion = data["question"]
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.SliderQuestion)
 
-        data.pop("index")
-        await data["message"].edit_text(
+        session.index = None
+        await edit_message(
+            session,
             question_text(question),
-            reply_markup=get_slider_buttons(question, data["sliders"]),
+            reply_markup=get_slider_buttons(question, session.sliders),
         )
 
     await clb.answer()
@@ -479,152 +748,116 @@ async def slider_value_handler(msg: Message, state: FSMContext) -> None:
     await msg.delete()
 
     async with state.proxy() as data:
-        question: models.poll.SliderQuestion = data["question"]
-        sliders: list[int | None] = data["sliders"]
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.SliderQuestion)
 
         try:
             value = int(msg.text)
         except ValueError:
-            await data["message"].edit_text(
+            await edit_message(
+                session,
                 "Value is incorrect. Try again.",
                 reply_markup=cancel_buttons,
             )
             return
 
         if not (question.min_value <= value <= question.max_value):
-            await data["message"].edit_text(
+            await edit_message(
+                session,
                 f"Value must be between {question.min_value} and {question.max_value}.\n"
                 "Try again.",
                 reply_markup=cancel_buttons,
             )
             return
 
-        sliders[data["index"]] = value
-        data.pop("index")
+        assert session.index is not None
+        session.sliders[session.index] = value
+        session.index = None
 
-        await data["message"].edit_text(
+        await edit_message(
+            session,
             question_text(question),
-            reply_markup=get_slider_buttons(question, sliders),
+            reply_markup=get_slider_buttons(question, session.sliders),
         )
 
     await AnswersState.slider.set()
 
 
-@dp.callback_query_handler(add_callback_data.filter(), state=AnswersState.top_list)
-async def top_list_add_handler(
-    clb: CallbackQuery,
-    state: FSMContext,
-    callback_data: dict[str, str],
-) -> None:
-    await AnswersState.wait_top_list_rank.set()
-
-    async with state.proxy() as data:
-        question: models.poll.TopListQuestion = data["question"]
-        ranks: list[int] = data["ranks"]
-
-        await clb.message.edit_text(
-            "Select an option",
-            reply_markup=get_top_list_options(question, ranks).row(
-                cancel_buttons.inline_keyboard[0][0]
-            ),
-        )
-
-    await clb.answer()
-
-
 @dp.callback_query_handler(option_callback_data.filter(), state=AnswersState.top_list)
-async def top_list_edit_option_handler(
+async def top_list_add_option_handler(
     clb: CallbackQuery,
     state: FSMContext,
     callback_data: dict[str, str],
 ) -> None:
-    await AnswersState.wait_top_list_rank.set()
-
-    edit_index = int(callback_data["index"])
+    index = int(callback_data["index"])
     async with state.proxy() as data:
-        question: models.poll.TopListQuestion = data["question"]
-        ranks: list[int] = data["ranks"]
-        data["edit_index"] = edit_index
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.TopListQuestion)
 
-        await clb.message.edit_text(
-            "Select an option",
-            reply_markup=get_top_list_options(question, ranks).row(
-                cancel_buttons.inline_keyboard[0][0]
-            ),
+        max_ranks = (
+            question.max_ranks
+            if question.max_ranks is not None
+            else len(question.options)
+        )
+        if (
+            0 <= index < len(question.options)
+            and index not in session.ranks
+            and len(session.ranks) < max_ranks
+        ):
+            session.ranks.append(index)
+
+        bot.coalescer.edit_reply_markup(
+            session.chat_id,
+            session.message_id,
+            get_top_list_buttons(question, session.ranks),
         )
 
     await clb.answer()
 
 
-@dp.callback_query_handler(delete_callback_data.filter(), state=AnswersState.top_list)
-async def top_list_remove_option_handler(
+@dp.callback_query_handler(move_callback_data.filter(), state=AnswersState.top_list)
+async def top_list_move_option_handler(
     clb: CallbackQuery,
     state: FSMContext,
     callback_data: dict[str, str],
 ) -> None:
     index = int(callback_data["index"])
+    target = index + int(callback_data["offset"])
     async with state.proxy() as data:
-        question: models.poll.TopListQuestion = data["question"]
-        ranks: list[int] = data["ranks"]
-
-        ranks.pop(index)
-
-        await clb.message.edit_text(
-            question_text(question),
-            reply_markup=get_top_list_buttons(question, ranks),
-        )
-
-    await clb.answer()
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.TopListQuestion)
 
+        if 0 <= index < len(session.ranks) and 0 <= target < len(session.ranks):
+            ranks = session.ranks
+            ranks[index], ranks[target] = ranks[target], ranks[index]
 
-@dp.callback_query_handler(
-    cancel_callback_data.filter(),
-    state=AnswersState.wait_top_list_rank,
-)
-async def cancel_top_list_select_option_handler(
-    clb: CallbackQuery,
-    state: FSMContext,
-    callback_data: dict[str, str],
-) -> None:
-    await AnswersState.top_list.set()
-
-    async with state.proxy() as data:
-        question: models.poll.TopListQuestion = data["question"]
-
-        await data["message"].edit_text(
-            question_text(question),
-            reply_markup=get_top_list_buttons(question, data["ranks"]),
+        bot.coalescer.edit_reply_markup(
+            session.chat_id,
+            session.message_id,
+            get_top_list_buttons(question, session.ranks),
         )
 
-        data.pop("edit_index")
-
     await clb.answer()
 
 
-@dp.callback_query_handler(
-    option_callback_data.filter(), state=AnswersState.wait_top_list_rank
-)
-async def top_list_select_option_handler(
+@dp.callback_query_handler(delete_callback_data.filter(), state=AnswersState.top_list)
+async def top_list_remove_option_handler(
     clb: CallbackQuery,
     state: FSMContext,
     callback_data: dict[str, str],
 ) -> None:
-    await AnswersState.top_list.set()
-
     index = int(callback_data["index"])
     async with state.proxy() as data:
-        question: models.poll.TopListQuestion = data["question"]
-        ranks: list[int] = data["ranks"]
-        edit_index: int | None = data.pop("edit_index", None)
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.TopListQuestion)
 
-        if edit_index is None:
-            ranks.append(index)
-        else:
-            ranks[edit_index] = index
+        if 0 <= index < len(session.ranks):
+            session.ranks.pop(index)
 
-        await clb.message.edit_text(
-            question_text(question),
-            reply_markup=get_top_list_buttons(question, ranks),
+        bot.coalescer.edit_reply_markup(
+            session.chat_id,
+            session.message_id,
+            get_top_list_buttons(question, session.ranks),
         )
 
     await clb.answer()
@@ -635,26 +868,30 @@ async def text_answer_handler(msg: Message, state: FSMContext) -> None:
     await msg.delete()
 
     async with state.proxy() as data:
-        question: models.poll.TextQuestion = data["question"]
+        session: Session = data["session"]
+        question = await get_question(session, models.poll.TextQuestion)
 
         if question.min_length is not None and len(msg.text) < question.min_length:
-            await data["message"].edit_text(
-                f"Message length must be greater than {question.min_length-1}"
+            await edit_message(
+                session,
+                f"Message length must be greater than {question.min_length-1}",
             )
             return
         if question.max_length is not None and len(msg.text) > question.max_length:
-            await data["message"].edit_text(
-                f"Message length must be less than {question.max_length+1}"
+            await edit_message(
+                session,
+                f"Message length must be less than {question.max_length+1}",
             )
             return
 
-        data["text"] = msg.text
-        await data["message"].edit_text(
+        session.text = msg.text
+        await edit_message(
+            session,
             f"You answer is «{msg.text}».\nSend a message to change your answer.",
-            reply_markup=InlineKeyboardMarkup().row(send_button),
+            reply_markup=send_buttons,
         )
 
 
 @dp.message_handler(content_types=[ContentType.ANY], state=AnswersState)
 async def other_message_handler(msg: Message) -> None:
-    await msg.delete()
+    bot.deleter.delete(msg.chat.id, msg.message_id)
@@ -2,8 +2,8 @@ from aiogram.dispatcher import FSMContext
 from aiogram.types import ContentType, ForceReply, Message
 
 import handlers
-from bot import bot, dp
-from commands import code_state_commands, target_scope
+from bot import command_scopes, dp
+from commands import code_state_commands
 from states import CodeState
 
 
@@ -18,7 +18,7 @@ async def start_command(msg: Message, state: FSMContext) -> None:
             reply_markup=ForceReply.create("Connection code"),
         )
         await CodeState.wait_code.set()
-        await bot.set_my_commands(code_state_commands, target_scope(msg.from_user.id))
+        command_scopes.set(msg.from_user.id, code_state_commands)
     else:
         try:
             poll_id = int(args)
@@ -35,7 +35,7 @@ async def start_command(msg: Message, state: FSMContext) -> None:
 @dp.message_handler(commands=["cancel"], state=CodeState)
 async def cancel_command(msg: Message, state: FSMContext) -> None:
     await msg.reply("Operation canceled. Send me /start to try again.")
-    await bot.delete_my_commands(target_scope(msg.from_user.id))
+    command_scopes.delete(msg.from_user.id)
     await state.finish()
 
 
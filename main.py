@@ -13,6 +13,10 @@ import api
 import states
 import commands
 import handlers
+import outbox
+import webhook
+from transport import transport
+from settings import settings
 
 logging.basicConfig(level=logging.INFO)
 
@@ -29,8 +33,23 @@ async def error_handler(upd: Update, exc: Exception) -> bool | None:
 
 
 async def on_startup(dispatcher: Dispatcher) -> None:
+    await bot.bot.use_session(await transport.start())
+
     await bot.bot.set_my_commands(commands.global_commands)
+    await outbox.outbox.start()
+    await handlers.poll.restore_answers_states()
+    handlers.poll.reaper.start()
+
+
+async def on_shutdown(dispatcher: Dispatcher) -> None:
+    await handlers.poll.reaper.close()
+    await outbox.outbox.close()
+    await bot.scheduler.close()
+    await transport.close()
 
 
 if __name__ == "__main__":
-    start_polling(bot.dp, on_startup=on_startup)
+    if settings.webhook_url is None:
+        start_polling(bot.dp, on_startup=on_startup, on_shutdown=on_shutdown)
+    else:
+        webhook.start_webhook(bot.dp, on_startup=on_startup, on_shutdown=on_shutdown)
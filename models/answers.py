@@ -1,7 +1,7 @@
-from typing import Any, TypeAlias
+from typing import Annotated, Any, Literal, Mapping, TypeAlias
 from uuid import UUID
 
-from pydantic import validator
+from pydantic import Field, validator
 
 from models import BaseModel, account, poll
 
@@ -12,7 +12,7 @@ class BaseValue(BaseModel):
 
 
 class SelectorValue(BaseValue):
-    question_type = poll.QuestionType.selector
+    question_type: Literal[poll.QuestionType.selector] = poll.QuestionType.selector
     selected: set[int]
 
     def check(self, question: poll.SelectorQuestion) -> None:
@@ -31,7 +31,7 @@ class SelectorValue(BaseValue):
 
 
 class SliderValue(BaseValue):
-    question_type = poll.QuestionType.slider
+    question_type: Literal[poll.QuestionType.slider] = poll.QuestionType.slider
     sliders: list[int]
 
     def check(self, question: poll.SliderQuestion) -> None:
@@ -44,7 +44,7 @@ class SliderValue(BaseValue):
 
 
 class TopListValue(BaseValue):
-    question_type = poll.QuestionType.top_list
+    question_type: Literal[poll.QuestionType.top_list] = poll.QuestionType.top_list
     ranks: list[int]
 
     def check(self, question: poll.TopListQuestion) -> None:
@@ -64,7 +64,7 @@ class TopListValue(BaseValue):
 
 
 class TextValue(BaseValue):
-    question_type = poll.QuestionType.text
+    question_type: Literal[poll.QuestionType.text] = poll.QuestionType.text
     text: str
 
     def check(self, question: poll.TextQuestion) -> None:
@@ -76,7 +76,10 @@ class TextValue(BaseValue):
         ), f"len(value) <= {question.max_length}"
 
 
-Value: TypeAlias = SelectorValue | SliderValue | TopListValue | TextValue
+Value: TypeAlias = Annotated[
+    SelectorValue | SliderValue | TopListValue | TextValue,
+    Field(discriminator="question_type"),
+]
 
 
 class AnswerSchema(BaseModel):
@@ -112,13 +115,14 @@ class Answer(BaseModel):
         values: dict[str, Any],
         **kwargs: Any,
     ) -> AnswerSchema:
-        uuids: dict[UUID, poll.Question] = values["poll"].poll.uuids
+        index: Mapping[UUID, poll.QuestionEntry] = values["poll"].poll.index
         for v in value.values:
             assert (
-                v.question_id in uuids
+                v.question_id in index
             ), f"Question with id {v.question_id} is not included in the poll"
+            question = index[v.question_id].question
             assert (
-                uuids[v.question_id].question_type == v.question_type
-            ), f"Question and value has different types ({v.question_type} != {uuids[v.question_id].question_type})"
-            v.check(uuids[v.question_id])  # type: ignore[arg-type]
+                question.question_type == v.question_type
+            ), f"Question and value has different types ({v.question_type} != {question.question_type})"
+            v.check(question)  # type: ignore[arg-type]
         return value
@@ -1,8 +1,9 @@
 from enum import IntEnum, auto
-from typing import Any, Literal, TypeAlias
+from types import MappingProxyType
+from typing import Annotated, Any, Literal, Mapping, NamedTuple, TypeAlias
 from uuid import UUID, uuid4
 
-from pydantic import Field, validator
+from pydantic import Field, PrivateAttr, validator
 
 from models import BaseModel, account
 
@@ -15,6 +16,9 @@ class QuestionType(IntEnum):
 
 
 class BaseQuestion(BaseModel):
+    class Config:
+        allow_mutation = False
+
     question_id: UUID = Field(default_factory=uuid4)
     question_type: QuestionType
     label: str = Field(min_length=1)
@@ -22,8 +26,19 @@ class BaseQuestion(BaseModel):
     image: str | None = None
     hide_results: bool = False
 
+    _fingerprint: int | None = PrivateAttr(None)
+
+    @property
+    def fingerprint(self) -> int:
+        if self._fingerprint is None:
+            self._fingerprint = hash(self.json())
+        return self._fingerprint
+
 
 class Option(BaseModel):
+    class Config:
+        allow_mutation = False
+
     label: str
     image: str | None
 
@@ -123,7 +138,10 @@ class TextQuestion(BaseQuestion):
         return value
 
 
-Question: TypeAlias = SelectorQuestion | SliderQuestion | TopListQuestion | TextQuestion
+Question: TypeAlias = Annotated[
+    SelectorQuestion | SliderQuestion | TopListQuestion | TextQuestion,
+    Field(discriminator="question_type"),
+]
 
 
 class PlotType(IntEnum):
@@ -136,13 +154,20 @@ class PlotType(IntEnum):
 
 
 class BasePlot(BaseModel):
+    class Config:
+        allow_mutation = False
+
     plot_type: PlotType
     name: str = Field(min_length=1)
     questions: list[Question] = []
 
+    _uuids: Mapping[UUID, Question] | None = PrivateAttr(None)
+
     @property
-    def uuids(self) -> dict[UUID, Question]:
-        return {q.question_id: q for q in self.questions}
+    def uuids(self) -> Mapping[UUID, Question]:
+        if self._uuids is None:
+            self._uuids = MappingProxyType({q.question_id: q for q in self.questions})
+        return self._uuids
 
     @validator("questions")
     def questions_validator(
@@ -212,18 +237,47 @@ class WordCloudPlot(BasePlot):
     plot_type: Literal[PlotType.word_cloud] = PlotType.word_cloud
 
 
-Plot: TypeAlias = (
-    BarPlot | PiePlot | DoughnutPlot | RadarPlot | AreaPlot | WordCloudPlot
-)
+Plot: TypeAlias = Annotated[
+    BarPlot | PiePlot | DoughnutPlot | RadarPlot | AreaPlot | WordCloudPlot,
+    Field(discriminator="plot_type"),
+]
+
+
+class QuestionEntry(NamedTuple):
+    question: Question
+    plot: Plot
+    position: int
 
 
 class PollSchema(BaseModel):
+    class Config:
+        allow_mutation = False
+
     name: str = Field(min_length=1)
     plots: list[Plot] = []
 
+    _index: Mapping[UUID, QuestionEntry] | None = PrivateAttr(None)
+    _uuids: Mapping[UUID, Question] | None = PrivateAttr(None)
+
     @property
-    def uuids(self) -> dict[UUID, Question]:
-        return {u: q for p in self.plots for u, q in p.uuids.items()}
+    def index(self) -> Mapping[UUID, QuestionEntry]:
+        if self._index is None:
+            self._index = MappingProxyType(
+                {
+                    question.question_id: QuestionEntry(question, plot, position)
+                    for plot in self.plots
+                    for position, question in enumerate(plot.questions)
+                }
+            )
+        return self._index
+
+    @property
+    def uuids(self) -> Mapping[UUID, Question]:
+        if self._uuids is None:
+            self._uuids = MappingProxyType(
+                {u: entry.question for u, entry in self.index.items()}
+            )
+        return self._uuids
 
     @validator("plots")
     def plots_validator(
@@ -0,0 +1,493 @@
+import logging
+from asyncio import Event, Future, Task, create_task, get_running_loop, sleep
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum, auto
+from functools import partial
+from heapq import heappop, heappush
+from itertools import count
+from time import monotonic
+from typing import Any, Awaitable, Callable, Coroutine, Iterator, TypeAlias
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils import json
+from aiogram.utils.exceptions import MessageNotModified, RetryAfter, TelegramAPIError
+from aiohttp import ClientSession
+
+log = logging.getLogger(__name__)
+
+ChatId: TypeAlias = int | str | None
+Rendered: TypeAlias = tuple[str | None, str | None]
+Markup: TypeAlias = InlineKeyboardMarkup | str
+
+
+class Priority(IntEnum):
+    question = auto()
+    reply = auto()
+    notice = auto()
+    commands = auto()
+
+
+current_priority: ContextVar[Priority] = ContextVar(
+    "current_priority",
+    default=Priority.reply,
+)
+
+method_priorities = {
+    "deleteMessage": Priority.notice,
+    "deleteMessages": Priority.notice,
+    "setMyCommands": Priority.commands,
+    "deleteMyCommands": Priority.commands,
+}
+
+scheduled_methods = {
+    "sendMessage",
+    "editMessageText",
+    "editMessageReplyMarkup",
+    "deleteMessage",
+    "deleteMessages",
+    "setMyCommands",
+    "deleteMyCommands",
+}
+
+
+def request_chat_id(data: dict[str, Any] | None) -> ChatId:
+    if data is None:
+        return None
+    if "chat_id" not in data and "scope" in data:
+        scope = data["scope"]
+        if isinstance(scope, str):
+            scope = json.loads(scope)
+        return scope.get("chat_id")
+    return data.get("chat_id")
+
+
+coalesced_edit: ContextVar[bool] = ContextVar("coalesced_edit", default=False)
+
+
+def request_priority(method: str) -> Priority:
+    priority = method_priorities.get(method)
+    if priority is None:
+        return current_priority.get()
+
+    explicit = current_priority.get(None)
+    return priority if explicit is None else min(priority, explicit)
+
+
+@contextmanager
+def prioritized(priority: Priority) -> Iterator[None]:
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = monotonic()
+
+    def refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self) -> bool:
+        if self.delay() > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    @property
+    def full(self) -> bool:
+        self.refill()
+        return self.tokens >= self.burst
+
+
+@dataclass
+class Request:
+    priority: Priority
+    order: int
+    call: Callable[[], Awaitable[Any]]
+    future: Future[Any] = field(repr=False)
+
+
+class Scheduler:
+    def __init__(
+        self,
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: float,
+    ) -> None:
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+
+        self.order = count()
+        self.chats: dict[ChatId, deque[Request]] = {}
+        self.buckets: dict[ChatId, TokenBucket] = {}
+        self.active: set[ChatId] = set()
+        self.ready: list[tuple[Priority, int, ChatId]] = []
+        self.wakeup = Event()
+        self.task: Task[None] | None = None
+
+    def submit(
+        self,
+        chat_id: ChatId,
+        priority: Priority,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Future[Any]:
+        if self.task is None:
+            self.task = create_task(self.worker())
+
+        request = Request(
+            priority,
+            next(self.order),
+            call,
+            get_running_loop().create_future(),
+        )
+        self.chats.setdefault(chat_id, deque()).append(request)
+        if chat_id not in self.active:
+            self.active.add(chat_id)
+            self.push(chat_id)
+
+        return request.future
+
+    def push(self, chat_id: ChatId) -> None:
+        head = self.chats[chat_id][0]
+        heappush(self.ready, (head.priority, head.order, chat_id))
+        self.wakeup.set()
+
+    def release(self, chat_id: ChatId) -> None:
+        if len(self.chats.get(chat_id, ())) > 0:
+            self.push(chat_id)
+        else:
+            self.chats.pop(chat_id, None)
+            self.active.discard(chat_id)
+
+    def postpone(self, chat_id: ChatId, delay: float) -> None:
+        get_running_loop().call_later(delay, self.release, chat_id)
+
+    async def worker(self) -> None:
+        while True:
+            if len(self.ready) == 0:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            delay = self.global_bucket.delay()
+            if delay > 0:
+                await sleep(delay)
+                continue
+
+            chat_id = heappop(self.ready)[2]
+            if chat_id is not None:
+                bucket = self.buckets.get(chat_id)
+                if bucket is None:
+                    bucket = self.buckets[chat_id] = TokenBucket(
+                        self.chat_rate,
+                        self.chat_burst,
+                    )
+                if not bucket.take():
+                    self.postpone(chat_id, bucket.delay())
+                    continue
+
+            self.global_bucket.take()
+            create_task(self.run(chat_id, self.chats[chat_id].popleft()))
+
+            if len(self.buckets) > len(self.active) * 2 + 1024:
+                self.prune()
+
+    async def run(self, chat_id: ChatId, request: Request) -> None:
+        try:
+            result = await request.call()
+        except RetryAfter as exc:
+            log.warning(
+                "Flood control for chat %s, retry in %s s", chat_id, exc.timeout
+            )
+            self.chats.setdefault(chat_id, deque()).appendleft(request)
+            self.postpone(chat_id, exc.timeout)
+            return
+        except Exception as exc:
+            if not request.future.done():
+                request.future.set_exception(exc)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
+
+        self.release(chat_id)
+
+    def prune(self) -> None:
+        for chat_id, bucket in list(self.buckets.items()):
+            if chat_id not in self.active and bucket.full:
+                del self.buckets[chat_id]
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+@dataclass
+class PendingEdit:
+    text: str | None
+    reply_markup: Markup | None
+    priority: Priority
+    task: Task[None] | None = field(default=None, repr=False)
+
+
+class EditCoalescer:
+    def __init__(self, bot: Bot, delay: float) -> None:
+        self.bot = bot
+        self.delay = delay
+        self.pending: dict[tuple[int, int], PendingEdit] = {}
+
+    def edit_text(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str,
+        reply_markup: Markup | None = None,
+    ) -> None:
+        self.schedule(chat_id, message_id, text, reply_markup)
+
+    def edit_reply_markup(
+        self,
+        chat_id: int,
+        message_id: int,
+        reply_markup: Markup | None = None,
+    ) -> None:
+        self.schedule(chat_id, message_id, None, reply_markup)
+
+    def schedule(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str | None,
+        reply_markup: Markup | None,
+    ) -> None:
+        key = (chat_id, message_id)
+        edit = self.pending.get(key)
+
+        if edit is None:
+            edit = self.pending[key] = PendingEdit(
+                text,
+                reply_markup,
+                current_priority.get(),
+            )
+            edit.task = create_task(self.send(key, self.delay))
+        else:
+            if text is not None:
+                edit.text = text
+            edit.reply_markup = reply_markup
+            edit.priority = min(edit.priority, current_priority.get())
+
+    def discard(self, chat_id: int, message_id: int) -> None:
+        edit = self.pending.pop((chat_id, message_id), None)
+        if edit is not None and edit.task is not None:
+            edit.task.cancel()
+
+    async def flush(self, chat_id: int, message_id: int) -> None:
+        key = (chat_id, message_id)
+        edit = self.pending.get(key)
+        if edit is not None and edit.task is not None:
+            edit.task.cancel()
+            await self.send(key, 0)
+
+    async def send(self, key: tuple[int, int], delay: float) -> None:
+        if delay > 0:
+            await sleep(delay)
+
+        edit = self.pending.pop(key, None)
+        if edit is None:
+            return
+
+        chat_id, message_id = key
+        token = coalesced_edit.set(True)
+        try:
+            with prioritized(edit.priority):
+                if edit.text is not None:
+                    await self.bot.edit_message_text(
+                        edit.text,
+                        chat_id,
+                        message_id,
+                        reply_markup=edit.reply_markup,
+                    )
+                else:
+                    await self.bot.edit_message_reply_markup(
+                        chat_id,
+                        message_id,
+                        reply_markup=edit.reply_markup,
+                    )
+        except MessageNotModified:
+            pass
+        except TelegramAPIError:
+            log.exception("Coalesced edit of message %s failed", message_id)
+        finally:
+            coalesced_edit.reset(token)
+
+
+class DeleteBatcher:
+    def __init__(self, bot: Bot, delay: float, size: int) -> None:
+        self.bot = bot
+        self.delay = delay
+        self.size = size
+        self.pending: dict[int, list[int]] = {}
+        self.tasks: set[Task[None]] = set()
+
+    def delete(self, chat_id: int, message_id: int) -> None:
+        message_ids = self.pending.get(chat_id)
+        if message_ids is None:
+            message_ids = self.pending[chat_id] = []
+            self.spawn(self.send(chat_id))
+
+        message_ids.append(message_id)
+        if len(message_ids) >= self.size:
+            del self.pending[chat_id]
+            self.spawn(self.send_batch(chat_id, message_ids))
+
+    def spawn(self, coroutine: Coroutine[Any, Any, None]) -> None:
+        task = create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def send(self, chat_id: int) -> None:
+        await sleep(self.delay)
+
+        message_ids = self.pending.pop(chat_id, None)
+        if message_ids is not None:
+            await self.send_batch(chat_id, message_ids)
+
+    async def send_batch(self, chat_id: int, message_ids: list[int]) -> None:
+        try:
+            with prioritized(Priority.notice):
+                if len(message_ids) == 1:
+                    await self.bot.delete_message(chat_id, message_ids[0])
+                else:
+                    await self.bot.request(
+                        "deleteMessages",
+                        {"chat_id": chat_id, "message_ids": json.dumps(message_ids)},
+                    )
+        except TelegramAPIError:
+            log.exception(
+                "Deleting %s messages in chat %s failed", len(message_ids), chat_id
+            )
+
+
+class RenderedCache:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.messages: OrderedDict[tuple[ChatId, int], Rendered] = OrderedDict()
+
+    def get(self, chat_id: ChatId, message_id: int) -> Rendered | None:
+        key = (chat_id, message_id)
+        rendered = self.messages.get(key)
+        if rendered is not None:
+            self.messages.move_to_end(key)
+        return rendered
+
+    def set(self, chat_id: ChatId, message_id: int, rendered: Rendered) -> None:
+        key = (chat_id, message_id)
+        self.messages[key] = rendered
+        self.messages.move_to_end(key)
+        if len(self.messages) > self.size:
+            self.messages.popitem(last=False)
+
+    def discard(self, chat_id: ChatId, message_id: int) -> None:
+        self.messages.pop((chat_id, message_id), None)
+
+
+class ScheduledBot(Bot):
+    _session: ClientSession | None
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        edit_delay: float,
+        delete_delay: float,
+        rendered_size: int,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+        self.coalescer = EditCoalescer(self, edit_delay)
+        self.deleter = DeleteBatcher(self, delete_delay, 100)
+        self.rendered = RenderedCache(rendered_size)
+
+    async def use_session(self, session: ClientSession) -> None:
+        if self._session is not None and self._session is not session:
+            await self._session.close()
+        self._session = session
+
+    async def request(
+        self,
+        method: str,
+        data: dict[str, Any] | None = None,
+        files: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        call = partial(super().request, method, data, files, **kwargs)
+        if method not in scheduled_methods:
+            return await call()
+
+        if data is not None and "message_id" in data and not coalesced_edit.get():
+            if method == "editMessageReplyMarkup":
+                await self.coalescer.flush(data["chat_id"], data["message_id"])
+            else:
+                self.coalescer.discard(data["chat_id"], data["message_id"])
+
+        rendered: Rendered | None = None
+        if data is not None and "message_id" in data:
+            chat_id, message_id = data.get("chat_id"), data["message_id"]
+            last = self.rendered.get(chat_id, message_id)
+
+            if method == "deleteMessage":
+                self.rendered.discard(chat_id, message_id)
+            elif method == "editMessageText":
+                rendered = (data["text"], data.get("reply_markup"))
+            elif method == "editMessageReplyMarkup":
+                rendered = (last[0] if last else None, data.get("reply_markup"))
+
+            if rendered is not None and rendered == last:
+                return True
+
+        if rendered is not None:
+            self.rendered.set(chat_id, message_id, rendered)
+
+        try:
+            result = await self.scheduler.submit(
+                request_chat_id(data),
+                request_priority(method),
+                call,
+            )
+        except MessageNotModified:
+            raise
+        except Exception:
+            if (
+                rendered is not None
+                and self.rendered.get(chat_id, message_id) == rendered
+            ):
+                if last is None:
+                    self.rendered.discard(chat_id, message_id)
+                else:
+                    self.rendered.set(chat_id, message_id, last)
+            raise
+
+        if method == "sendMessage" and data is not None:
+            self.rendered.set(
+                data["chat_id"],
+                result["message_id"],
+                (data["text"], data.get("reply_markup")),
+            )
+
+        return result
@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+from asyncio import (
+    CancelledError,
+    Event,
+    Queue,
+    Task,
+    TimeoutError,
+    create_task,
+    get_running_loop,
+    sleep,
+)
+from dataclasses import dataclass, field
+from random import uniform
+from typing import IO, Any
+from uuid import uuid4
+
+from pydantic import parse_obj_as
+
+import api
+import models
+from resilience import CircuitOpen
+from settings import settings
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Entry:
+    poll_id: int
+    value: models.answers.Value
+    entry_id: str = field(default_factory=lambda: uuid4().hex)
+    attempts: int = 0
+
+    def record(self) -> dict[str, Any]:
+        return {
+            "op": "add",
+            "id": self.entry_id,
+            "poll_id": self.poll_id,
+            "value": self.value.serializable(),
+        }
+
+
+class Spool:
+    def __init__(self, path: str | None) -> None:
+        self.path = path
+        self.file: IO[str] | None = None
+        self.buffer: list[str] = []
+        self.compact = False
+        self.closing = False
+        self.wakeup = Event()
+        self.task: Task[None] | None = None
+
+    def load(self) -> list[Entry]:
+        if self.path is None or not os.path.exists(self.path):
+            return []
+
+        pending: dict[str, Entry] = {}
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                    if record["op"] == "add":
+                        pending[record["id"]] = Entry(
+                            record["poll_id"],
+                            parse_obj_as(
+                                models.answers.Value,  # type: ignore[arg-type]
+                                record["value"],
+                            ),
+                            record["id"],
+                        )
+                    else:
+                        pending.pop(record["id"], None)
+                except (KeyError, ValueError):
+                    log.warning("Skipping damaged answers spool record %r", line)
+
+        entries = list(pending.values())
+        self.write([json.dumps(entry.record()) + "\n" for entry in entries], True)
+        return entries
+
+    def append(self, record: dict[str, Any]) -> None:
+        if self.path is not None:
+            self.buffer.append(json.dumps(record) + "\n")
+            self.wakeup.set()
+
+    def truncate(self) -> None:
+        if self.path is not None:
+            self.buffer.clear()
+            self.compact = True
+            self.wakeup.set()
+
+    def write(self, lines: list[str], compact: bool) -> None:
+        assert self.path is not None
+
+        if compact:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            temporary = self.path + ".tmp"
+            with open(temporary, "w") as file:
+                file.writelines(lines)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+            return
+
+        if self.file is None:
+            self.file = open(self.path, "a")
+        self.file.writelines(lines)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    async def flush(self) -> None:
+        if len(self.buffer) == 0 and not self.compact:
+            return
+
+        lines, self.buffer = self.buffer, []
+        compact, self.compact = self.compact, False
+        try:
+            await get_running_loop().run_in_executor(None, self.write, lines, compact)
+        except OSError:
+            log.exception("Writing %s answers spool records failed", len(lines))
+
+    async def run(self) -> None:
+        while not self.closing:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self.path is not None and self.task is None:
+            self.task = create_task(self.run())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.closing = True
+            self.wakeup.set()
+            await self.task
+            self.task = None
+        if self.path is not None:
+            await self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Outbox:
+    def __init__(
+        self,
+        spool_path: str | None,
+        concurrency: int,
+        retry_delay: float,
+        max_retry_delay: float,
+    ) -> None:
+        self.spool = Spool(spool_path)
+        self.concurrency = concurrency
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.queue: Queue[Entry] = Queue()
+        self.pending: dict[str, Entry] = {}
+        self.tasks: list[Task[None]] = []
+
+    def submit(self, poll_id: int, value: models.answers.Value) -> None:
+        entry = Entry(poll_id, value)
+        self.spool.append(entry.record())
+        self.pending[entry.entry_id] = entry
+        self.queue.put_nowait(entry)
+
+    def done(self, entry: Entry) -> None:
+        del self.pending[entry.entry_id]
+        if len(self.pending) == 0:
+            self.spool.truncate()
+        else:
+            self.spool.append({"op": "done", "id": entry.entry_id})
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+        return uniform(delay / 2, delay)
+
+    async def deliver(self, entry: Entry) -> None:
+        while True:
+            try:
+                await api.add_value(entry.poll_id, entry.value)
+                return
+            except CancelledError:
+                raise
+            except CircuitOpen as exc:
+                await sleep(exc.retry_after)
+                continue
+            except TimeoutError as exc:
+                log.error(
+                    "Answer %s to poll %s timed out, its delivery is unknown",
+                    entry.entry_id,
+                    entry.poll_id,
+                    exc_info=exc,
+                )
+                return
+            except Exception as exc:
+                if not api.transient(exc):
+                    log.error(
+                        "Answer %s to poll %s was rejected",
+                        entry.entry_id,
+                        entry.poll_id,
+                        exc_info=exc,
+                    )
+                    return
+
+                entry.attempts += 1
+                delay = self.backoff(entry.attempts)
+                log.warning(
+                    "Answer %s to poll %s failed (attempt %s), retrying in %.1fs",
+                    entry.entry_id,
+                    entry.poll_id,
+                    entry.attempts,
+                    delay,
+                    exc_info=exc,
+                )
+                await sleep(delay)
+
+    async def worker(self) -> None:
+        while True:
+            entry = await self.queue.get()
+            try:
+                await self.deliver(entry)
+                self.done(entry)
+            finally:
+                self.queue.task_done()
+
+    async def start(self) -> None:
+        entries = await get_running_loop().run_in_executor(None, self.spool.load)
+        self.spool.start()
+        for entry in entries:
+            self.pending[entry.entry_id] = entry
+            self.queue.put_nowait(entry)
+        if len(self.pending) > 0:
+            log.info("Replaying %s spooled answers", len(self.pending))
+
+        self.tasks = [create_task(self.worker()) for _ in range(self.concurrency)]
+
+    async def close(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        await self.spool.close()
+
+
+outbox = Outbox(
+    settings.outbox_spool_path,
+    settings.outbox_concurrency
+    if settings.answers_batch_window is None
+    else max(settings.outbox_concurrency, settings.answers_batch_size),
+    settings.outbox_retry_delay,
+    settings.outbox_max_retry_delay,
+)
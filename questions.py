@@ -0,0 +1,34 @@
+from asyncio import Event
+from collections import OrderedDict
+from uuid import UUID
+
+import models
+from settings import QueuePolicy
+
+
+class QuestionQueue:
+    def __init__(self, policy: QueuePolicy, size: int) -> None:
+        self.policy = policy
+        self.size = size if policy == QueuePolicy.drop_oldest else 1
+        self.items: OrderedDict[UUID, models.poll.Question] = OrderedDict()
+        self.event = Event()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def put(self, question: models.poll.Question) -> bool:
+        was_empty = len(self.items) == 0
+
+        self.items.pop(question.question_id, None)
+        self.items[question.question_id] = question
+        while len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+        self.event.set()
+        return was_empty
+
+    async def get(self) -> models.poll.Question:
+        while len(self.items) == 0:
+            self.event.clear()
+            await self.event.wait()
+        return self.items.popitem(last=False)[1]
@@ -0,0 +1,108 @@
+import logging
+from asyncio import Task, create_task, sleep
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Coroutine, TypeAlias
+
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+log = logging.getLogger(__name__)
+
+Key: TypeAlias = tuple[int, int]
+Evict: TypeAlias = Callable[[int, int], Coroutine[None, None, None]]
+
+
+class SessionReaper:
+    def __init__(self, ttl: float, limit: int, interval: float, evict: Evict) -> None:
+        self.ttl = ttl
+        self.limit = limit
+        self.interval = interval
+        self.evict = evict
+        self.seen: OrderedDict[Key, float] = OrderedDict()
+        self.evicting: set[Key] = set()
+        self.tasks: set[Task[None]] = set()
+        self.task: Task[None] | None = None
+
+    def add(self, chat_id: int, user_id: int) -> None:
+        key = (chat_id, user_id)
+        self.seen[key] = monotonic()
+        self.seen.move_to_end(key)
+
+        while len(self.seen) > self.limit:
+            oldest = next(iter(self.seen))
+            log.info("Session limit reached, evicting session %s", oldest)
+            self.reap(oldest)
+
+    def touch(self, chat_id: int, user_id: int) -> None:
+        key = (chat_id, user_id)
+        if key in self.seen:
+            self.seen[key] = monotonic()
+            self.seen.move_to_end(key)
+
+    def forget(self, chat_id: int, user_id: int) -> None:
+        self.seen.pop((chat_id, user_id), None)
+
+    def reap(self, key: Key) -> None:
+        self.seen.pop(key, None)
+        if key in self.evicting:
+            return
+
+        self.evicting.add(key)
+        task = create_task(self.run_evict(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_evict(self, key: Key) -> None:
+        try:
+            await self.evict(*key)
+        except Exception:
+            log.exception("Evicting session %s failed", key)
+        finally:
+            self.evicting.discard(key)
+
+    def expire(self, now: float) -> None:
+        while len(self.seen) > 0:
+            key, seen = next(iter(self.seen.items()))
+            if now - seen <= self.ttl:
+                break
+            log.info("Evicting idle session %s", key)
+            self.reap(key)
+
+    async def run(self) -> None:
+        while True:
+            await sleep(self.interval)
+            self.expire(monotonic())
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = create_task(self.run())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+class ActivityMiddleware(BaseMiddleware):
+    def __init__(self, reaper: SessionReaper) -> None:
+        super().__init__()
+        self.reaper = reaper
+
+    async def on_pre_process_message(
+        self,
+        message: Message,
+        data: dict[str, Any],
+    ) -> None:
+        if message.from_user is not None:
+            self.reaper.touch(message.chat.id, message.from_user.id)
+
+    async def on_pre_process_callback_query(
+        self,
+        query: CallbackQuery,
+        data: dict[str, Any],
+    ) -> None:
+        chat_id = (
+            query.message.chat.id if query.message is not None else query.from_user.id
+        )
+        self.reaper.touch(chat_id, query.from_user.id)
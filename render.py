@@ -0,0 +1,35 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils import json
+
+from settings import settings
+
+
+def dump(markup: InlineKeyboardMarkup) -> str:
+    return json.dumps(markup.to_python())
+
+
+class RenderCache:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries: OrderedDict[Hashable, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> str:
+        rendered = self.entries.get(key)
+        if rendered is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return rendered
+
+        self.misses += 1
+        rendered = self.entries[key] = render()
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return rendered
+
+
+renders = RenderCache(settings.render_cache_size)
@@ -0,0 +1,153 @@
+from asyncio import (
+    FIRST_COMPLETED,
+    CancelledError,
+    Task,
+    create_task,
+    wait,
+    wait_for,
+)
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, Coroutine, Generic, TypeAlias, TypeVar
+
+T = TypeVar("T")
+Request: TypeAlias = Callable[[], Coroutine[Any, Any, T]]
+
+
+class CircuitOpen(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Circuit is open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    def __init__(
+        self,
+        window: int,
+        quantile: float,
+        multiplier: float,
+        min_timeout: float,
+        max_timeout: float,
+    ) -> None:
+        self.timeout_quantile = quantile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.samples: deque[float] = deque(maxlen=window)
+        self.sorted: list[float] | None = None
+
+    def observe(self, latency: float) -> None:
+        self.samples.append(latency)
+        self.sorted = None
+
+    def quantile(self, quantile: float) -> float | None:
+        if len(self.samples) < 10:
+            return None
+        if self.sorted is None:
+            self.sorted = sorted(self.samples)
+        return self.sorted[min(int(quantile * len(self.sorted)), len(self.sorted) - 1)]
+
+    def timeout(self) -> float:
+        latency = self.quantile(self.timeout_quantile)
+        if latency is None:
+            return self.max_timeout
+        return min(max(latency * self.multiplier, self.min_timeout), self.max_timeout)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_timeout: float) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    def check(self) -> bool:
+        if self.opened_at is None:
+            return False
+
+        remaining = self.opened_at + self.reset_timeout - monotonic()
+        if remaining > 0:
+            raise CircuitOpen(remaining)
+        if self.probing:
+            raise CircuitOpen(self.reset_timeout)
+        self.probing = True
+        return True
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = monotonic()
+        self.probing = False
+
+    def release(self) -> None:
+        self.probing = False
+
+
+class Endpoint(Generic[T]):
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        breaker: CircuitBreaker,
+        hedge_quantile: float | None,
+        failure: Callable[[Exception], bool],
+    ) -> None:
+        self.tracker = tracker
+        self.breaker = breaker
+        self.hedge_quantile = hedge_quantile
+        self.failure = failure
+        self.hedged = 0
+
+    async def call(self, request: Request[T]) -> T:
+        probe = self.breaker.check()
+
+        start = monotonic()
+        try:
+            result = await wait_for(self.attempt(request), self.tracker.timeout())
+        except CancelledError:
+            if probe:
+                self.breaker.release()
+            raise
+        except Exception as exc:
+            if self.failure(exc):
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            raise
+
+        self.tracker.observe(monotonic() - start)
+        self.breaker.success()
+        return result
+
+    async def attempt(self, request: Request[T]) -> T:
+        delay = (
+            None
+            if self.hedge_quantile is None
+            else self.tracker.quantile(self.hedge_quantile)
+        )
+        if delay is None:
+            return await request()
+
+        tasks: set[Task[T]] = {create_task(request())}
+        try:
+            done, tasks = await wait(tasks, timeout=delay)
+            if len(done) > 0:
+                return done.pop().result()
+
+            self.hedged += 1
+            tasks.add(create_task(request()))
+            while True:
+                done, tasks = await wait(tasks, return_when=FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if len(tasks) == 0:
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,183 @@
+from asyncio import Task, create_task, sleep
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from html import escape
+from uuid import UUID
+
+import models
+from outbound import Priority, ScheduledBot, prioritized
+
+
+@dataclass
+class SelectorTally:
+    counts: list[int]
+    answers: int = 0
+
+    def add(self, value: models.answers.SelectorValue) -> None:
+        self.answers += 1
+        for index in value.selected:
+            self.counts[index] += 1
+
+    def render(self, question: models.poll.SelectorQuestion) -> str:
+        return "\n".join(
+            f"{escape(option.label)}: {count}"
+            f" ({count * 100 // max(self.answers, 1)}%)"
+            for option, count in zip(question.options, self.counts)
+        )
+
+
+@dataclass
+class SliderTally:
+    sums: list[int]
+    answers: int = 0
+
+    def add(self, value: models.answers.SliderValue) -> None:
+        self.answers += 1
+        for index, slider in enumerate(value.sliders):
+            self.sums[index] += slider
+
+    @property
+    def means(self) -> list[float]:
+        return [total / max(self.answers, 1) for total in self.sums]
+
+    def render(self, question: models.poll.SliderQuestion) -> str:
+        return "\n".join(
+            f"{escape(option.label)}: {mean:.1f}"
+            for option, mean in zip(question.options, self.means)
+        )
+
+
+@dataclass
+class TopListTally:
+    scores: list[int]
+    answers: int = 0
+
+    def add(self, value: models.answers.TopListValue) -> None:
+        self.answers += 1
+        for place, index in enumerate(value.ranks):
+            self.scores[index] += len(self.scores) - place
+
+    def render(self, question: models.poll.TopListQuestion) -> str:
+        ranking = sorted(
+            range(len(self.scores)),
+            key=lambda index: self.scores[index],
+            reverse=True,
+        )
+        return "\n".join(
+            f"{place + 1}. {escape(question.options[index].label)}"
+            f" — {self.scores[index]}"
+            for place, index in enumerate(ranking)
+        )
+
+
+@dataclass
+class TextTally:
+    answers: int = 0
+
+    def add(self, value: models.answers.TextValue) -> None:
+        self.answers += 1
+
+    def render(self, question: models.poll.TextQuestion) -> str:
+        return ""
+
+
+Tally = SelectorTally | SliderTally | TopListTally | TextTally
+
+
+def new_tally(question: models.poll.BaseQuestion) -> Tally:
+    if isinstance(question, models.poll.SelectorQuestion):
+        return SelectorTally([0] * len(question.options))
+    if isinstance(question, models.poll.SliderQuestion):
+        return SliderTally([0] * len(question.options))
+    if isinstance(question, models.poll.TopListQuestion):
+        return TopListTally([0] * len(question.options))
+    return TextTally()
+
+
+@dataclass
+class Viewer:
+    chat_id: int
+    message_id: int
+    header: str
+
+
+@dataclass
+class LiveQuestion:
+    question: models.poll.BaseQuestion
+    tally: Tally
+    viewers: dict[int, Viewer] = field(default_factory=dict)
+    task: Task[None] | None = None
+
+
+class LiveResults:
+    def __init__(self, bot: ScheduledBot, interval: float, size: int) -> None:
+        self.bot = bot
+        self.interval = interval
+        self.size = size
+        self.questions: OrderedDict[UUID, LiveQuestion] = OrderedDict()
+        self.watching: dict[int, UUID] = {}
+
+    def live(self, question: models.poll.BaseQuestion) -> LiveQuestion:
+        live = self.questions.get(question.question_id)
+        if live is None:
+            live = self.questions[question.question_id] = LiveQuestion(
+                question, new_tally(question)
+            )
+            while len(self.questions) > self.size:
+                _, dropped = self.questions.popitem(last=False)
+                self.drop(dropped)
+        self.questions.move_to_end(question.question_id)
+        return live
+
+    def record(
+        self,
+        question: models.poll.BaseQuestion,
+        value: models.answers.Value,
+    ) -> None:
+        live = self.live(question)
+        live.tally.add(value)  # type: ignore[arg-type]
+        if len(live.viewers) > 0 and live.task is None:
+            live.task = create_task(self.push(live))
+
+    def text(self, question: models.poll.BaseQuestion) -> str:
+        live = self.live(question)
+        results = live.tally.render(question)  # type: ignore[arg-type]
+        return f"<b>Results</b> ({live.tally.answers} answers)\n{results}".rstrip()
+
+    def watch(
+        self,
+        question: models.poll.BaseQuestion,
+        user_id: int,
+        chat_id: int,
+        message_id: int,
+        header: str,
+    ) -> str:
+        self.unwatch(user_id)
+        live = self.live(question)
+        live.viewers[user_id] = Viewer(chat_id, message_id, header)
+        self.watching[user_id] = question.question_id
+        return f"{header}\n\n{self.text(question)}"
+
+    def unwatch(self, user_id: int) -> None:
+        question_id = self.watching.pop(user_id, None)
+        if question_id is not None and question_id in self.questions:
+            self.questions[question_id].viewers.pop(user_id, None)
+
+    def drop(self, live: LiveQuestion) -> None:
+        if live.task is not None:
+            live.task.cancel()
+        for user_id in live.viewers:
+            self.watching.pop(user_id, None)
+
+    async def push(self, live: LiveQuestion) -> None:
+        await sleep(self.interval)
+
+        text = self.text(live.question)
+        with prioritized(Priority.notice):
+            for viewer in live.viewers.values():
+                self.bot.coalescer.edit_text(
+                    viewer.chat_id,
+                    viewer.message_id,
+                    f"{viewer.header}\n\n{text}",
+                )
+        live.task = None
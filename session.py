@@ -0,0 +1,39 @@
+from dataclasses import dataclass, field
+from uuid import UUID
+
+
+@dataclass(slots=True)
+class Session:
+    poll_id: int
+    chat_id: int
+    message_id: int
+    dialog_id: int | None = None
+    question_id: UUID | None = None
+    completed: set[UUID] = field(default_factory=set)
+    selected: int = 0
+    sliders: list[int | None] = field(default_factory=list)
+    ranks: list[int] = field(default_factory=list)
+    text: str | None = None
+    index: int | None = None
+
+    def is_selected(self, index: int) -> bool:
+        return self.selected >> index & 1 == 1
+
+    def toggle(self, index: int) -> None:
+        self.selected ^= 1 << index
+
+    @property
+    def selected_indexes(self) -> set[int]:
+        return {
+            index
+            for index in range(self.selected.bit_length())
+            if self.is_selected(index)
+        }
+
+    def reset_answer(self) -> None:
+        self.question_id = None
+        self.selected = 0
+        self.sliders = []
+        self.ranks = []
+        self.text = None
+        self.index = None
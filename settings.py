@@ -1,10 +1,92 @@
+from enum import Enum
+
 from pydantic import BaseSettings
 
 
+class QueuePolicy(str, Enum):
+    drop_oldest = "drop_oldest"
+    latest_wins = "latest_wins"
+    keep_only_current = "keep_only_current"
+
+
 class Settings(BaseSettings):
     token: str
     api_url: str
     websocket_url: str
 
+    global_rate_limit: float = 30
+    chat_rate_limit: float = 1
+    chat_rate_burst: float = 3
+    edit_coalesce_delay: float = 0.3
+    delete_batch_delay: float = 1
+    rendered_cache_size: int = 100000
+    dispatch_concurrency: int = 256
+    flood_rate: float = 2
+    flood_burst: float = 10
+    flood_size: int = 100000
+    render_cache_size: int = 100000
+    command_scopes_size: int = 100000
+
+    websocket_reconnect_delay: float = 1
+    websocket_max_reconnect_delay: float = 60
+    questions_frames_size: int = 100
+
+    question_queue_policy: QueuePolicy = QueuePolicy.latest_wins
+    question_queue_size: int = 5
+
+    slider_grid_values: int = 10
+
+    group_refresh_interval: float = 3
+    group_history_size: int = 20
+
+    live_results_interval: float = 5
+    live_results_size: int = 1000
+
+    session_idle_ttl: float = 10800
+    session_limit: int = 50000
+    session_reap_interval: float = 60
+
+    storage_path: str | None = None
+    storage_flush_interval: float = 1
+    storage_batch_size: int = 500
+    storage_cache_size: int = 50000
+
+    http_pool_size: int = 200
+    http_pool_size_per_host: int = 100
+    http_keepalive_timeout: float = 30
+    http_dns_cache_ttl: int | None = 300
+    http_connect_timeout: float = 5
+    http_timeout: float = 60
+    http_stats_interval: float | None = None
+
+    api_latency_window: int = 200
+    api_timeout_quantile: float = 0.99
+    api_timeout_multiplier: float = 3
+    api_min_timeout: float = 1
+    api_max_timeout: float = 30
+    api_breaker_threshold: int = 5
+    api_breaker_reset: float = 10
+    api_hedge_quantile: float | None = None
+    api_answers_timeout: float = 30
+
+    poll_cache_size: int = 1000
+    poll_cache_ttl: float = 3600
+    poll_cache_revalidate: float = 30
+
+    answers_batch_window: float | None = None
+    answers_batch_size: int = 100
+
+    outbox_spool_path: str | None = None
+    outbox_concurrency: int = 8
+    outbox_retry_delay: float = 1
+    outbox_max_retry_delay: float = 60
+
+    webhook_url: str | None = None
+    webhook_secret: str | None = None
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_path: str = "/webhook"
+    webhook_queue_size: int = 10000
+
 
 settings = Settings()
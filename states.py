@@ -8,7 +8,6 @@ class CodeState(StatesGroup):
 class AnswersState(StatesGroup):
     wait_question = State()
     wait_slider_value = State()
-    wait_top_list_rank = State()
 
     selector = State()
     slider = State()
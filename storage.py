@@ -0,0 +1,288 @@
+import logging
+import pickle
+import sqlite3
+from asyncio import Event, Task, TimeoutError, create_task, get_running_loop, wait_for
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from dataclasses import dataclass, field, replace
+from io import BytesIO
+from typing import Any, Callable, TypeAlias, TypeVar
+
+from aiogram.dispatcher.storage import BaseStorage
+from aiogram.types.base import TelegramObject
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Key: TypeAlias = tuple[str, str]
+Address: TypeAlias = str | int | None
+
+
+class Pickler(pickle.Pickler):
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, TelegramObject):
+            return type(obj).to_object, (obj.to_python(),)
+        return NotImplemented
+
+
+def dumps(value: Any) -> bytes:
+    buffer = BytesIO()
+    Pickler(buffer, pickle.HIGHEST_PROTOCOL).dump(value)
+    return buffer.getvalue()
+
+
+@dataclass
+class Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    bucket: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data and not self.bucket
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float,
+        batch_size: int,
+        cache_size: int,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        self.executor = ThreadPoolExecutor(1, "sqlite-storage")
+        self.connection: sqlite3.Connection | None = None
+        self.records: dict[Key, Record] = {}
+        self.dirty: set[Key] = set()
+        self.flushing: set[Key] = set()
+        self.wakeup = Event()
+        self.task: Task[None] | None = None
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        return await get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS fsm ("
+                " chat TEXT NOT NULL,"
+                " user TEXT NOT NULL,"
+                " state TEXT,"
+                " data BLOB NOT NULL,"
+                " bucket BLOB NOT NULL,"
+                " PRIMARY KEY (chat, user)"
+                ") WITHOUT ROWID"
+            )
+        return self.connection
+
+    def load(self, key: Key) -> Record:
+        row = (
+            self.connect()
+            .execute(
+                "SELECT state, data, bucket FROM fsm WHERE chat = ? AND user = ?",
+                key,
+            )
+            .fetchone()
+        )
+        if row is None:
+            return Record()
+        return Record(row[0], pickle.loads(row[1]), pickle.loads(row[2]))
+
+    def write(self, records: list[tuple[Key, Record]]) -> None:
+        connection = self.connect()
+        with connection:
+            connection.executemany(
+                "DELETE FROM fsm WHERE chat = ? AND user = ?",
+                [key for key, record in records if record.empty],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO fsm VALUES (?, ?, ?, ?, ?)",
+                [
+                    (*key, record.state, dumps(record.data), dumps(record.bucket))
+                    for key, record in records
+                    if not record.empty
+                ],
+            )
+
+    def select_states(self, prefix: str) -> list[Key]:
+        return (
+            self.connect()
+            .execute(
+                "SELECT chat, user FROM fsm WHERE state LIKE ? || '%'",
+                (prefix,),
+            )
+            .fetchall()
+        )
+
+    async def record(self, chat: Address, user: Address) -> tuple[Key, Record]:
+        chat, user = self.check_address(chat=chat, user=user)
+        key = (str(chat), str(user))
+
+        record = self.records.pop(key, None)
+        if record is None:
+            loaded = await self.run(self.load, key)
+            record = self.records.pop(key, loaded)
+        self.records[key] = record
+
+        return key, record
+
+    def touch(self, key: Key) -> None:
+        self.dirty.add(key)
+
+        if self.task is None:
+            self.task = create_task(self.flusher())
+        if len(self.dirty) >= self.batch_size:
+            self.wakeup.set()
+
+    async def flusher(self) -> None:
+        while True:
+            try:
+                await wait_for(self.wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("FSM storage flush failed")
+
+    async def flush(self) -> None:
+        if len(self.dirty) == 0:
+            return
+
+        keys, self.dirty = self.dirty, set()
+        self.flushing = keys
+        try:
+            await self.run(
+                self.write,
+                [(key, replace(self.records[key])) for key in keys],
+            )
+        except Exception:
+            self.dirty |= keys
+            raise
+        finally:
+            self.flushing = set()
+
+        self.evict()
+
+    def evict(self) -> None:
+        for key in list(self.records):
+            if len(self.records) <= self.cache_size:
+                break
+            if key not in self.dirty and key not in self.flushing:
+                del self.records[key]
+
+    async def states(self, prefix: str) -> list[Key]:
+        await self.flush()
+        return await self.run(self.select_states, prefix)
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+    async def wait_closed(self) -> None:
+        if self.connection is not None:
+            await self.run(self.connection.close)
+            self.connection = None
+        self.executor.shutdown()
+
+    async def get_state(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        default: str | None = None,
+    ) -> str | None:
+        key, record = await self.record(chat, user)
+        return record.state if record.state is not None else default
+
+    async def get_data(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        default: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        key, record = await self.record(chat, user)
+        return deepcopy(record.data)
+
+    async def set_state(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        state: Any = None,
+    ) -> None:
+        key, record = await self.record(chat, user)
+        record.state = self.resolve_state(state)
+        self.touch(key)
+
+    async def set_data(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        data: dict[str, Any] | None = None,
+    ) -> None:
+        key, record = await self.record(chat, user)
+        record.data = deepcopy(data or {})
+        self.touch(key)
+
+    async def update_data(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        data: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        key, record = await self.record(chat, user)
+        record.data = {**record.data, **(data or {}), **kwargs}
+        self.touch(key)
+
+    def has_bucket(self) -> bool:
+        return True
+
+    async def get_bucket(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        default: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        key, record = await self.record(chat, user)
+        return deepcopy(record.bucket)
+
+    async def set_bucket(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        bucket: dict[str, Any] | None = None,
+    ) -> None:
+        key, record = await self.record(chat, user)
+        record.bucket = deepcopy(bucket or {})
+        self.touch(key)
+
+    async def update_bucket(
+        self,
+        *,
+        chat: Address = None,
+        user: Address = None,
+        bucket: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        key, record = await self.record(chat, user)
+        record.bucket = {**record.bucket, **(bucket or {}), **kwargs}
+        self.touch(key)
@@ -0,0 +1,5 @@
+import os
+
+os.environ.setdefault("TOKEN", "123456:ABCDEFabcdef")
+os.environ.setdefault("API_URL", "http://127.0.0.1")
+os.environ.setdefault("WEBSOCKET_URL", "ws://127.0.0.1")
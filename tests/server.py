@@ -0,0 +1,35 @@
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+
+import api
+from benchmarks.answers import selector_poll
+from benchmarks.backend import Backend
+from settings import settings
+from transport import transport
+
+
+class BackendTestCase(IsolatedAsyncioTestCase):
+    latency = 0.005
+    slow_rate = 0.0
+    slow_latency = 0.0
+
+    async def asyncSetUp(self) -> None:
+        self.backend = Backend(
+            selector_poll(), self.latency, self.slow_rate, self.slow_latency
+        )
+        self.runner = web.AppRunner(self.backend.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+
+        self.api_url = settings.api_url
+        settings.api_url = "http://127.0.0.1:%s" % self.runner.addresses[0][1]
+        api.breaker.success()
+        await transport.start()
+
+    async def asyncTearDown(self) -> None:
+        await transport.close()
+        await self.runner.cleanup()
+        settings.api_url = self.api_url
+        api.breaker.success()
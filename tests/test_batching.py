@@ -0,0 +1,90 @@
+from asyncio import gather
+from typing import Sequence
+from uuid import uuid4
+
+import api
+import models
+from tests.server import BackendTestCase
+
+
+def statuses(results: Sequence[models.answers.Answer | BaseException]) -> list[int]:
+    return [
+        result.args[0] if isinstance(result, api.HTTPException) else 200
+        for result in results
+    ]
+
+
+class AnswersBatcherTest(BackendTestCase):
+    def value(self, index: int) -> models.answers.SelectorValue:
+        question = self.backend.poll.poll.plots[0].questions[0]
+        return models.answers.SelectorValue(
+            question_id=question.question_id, selected={index % 5}
+        )
+
+    async def test_full_batches_are_sent_together(self) -> None:
+        batcher = api.AnswersBatcher(10, 50)
+        answers = await gather(
+            *(
+                batcher.add_value(self.backend.poll.id, self.value(i))
+                for i in range(200)
+            )
+        )
+
+        self.assertEqual(self.backend.requests, 4)
+        self.assertEqual(len(self.backend.answers), 200)
+        self.assertEqual(len({answer.id for answer in answers}), 200)
+
+    async def test_partial_batch_is_sent_after_window(self) -> None:
+        batcher = api.AnswersBatcher(0.05, 100)
+        answers = await gather(
+            *(batcher.add_value(self.backend.poll.id, self.value(i)) for i in range(3))
+        )
+
+        self.assertEqual(self.backend.requests, 1)
+        self.assertEqual([answer.id for answer in answers], [1, 2, 3])
+        self.assertEqual(batcher.pending, {})
+        self.assertEqual(batcher.timers, {})
+
+    async def test_answers_match_their_values(self) -> None:
+        batcher = api.AnswersBatcher(0.01, 100)
+        values = [self.value(i) for i in range(20)]
+        answers = await gather(
+            *(batcher.add_value(self.backend.poll.id, value) for value in values)
+        )
+
+        for value, answer in zip(values, answers):
+            self.assertEqual(answer.answer.values, [value])
+
+    async def test_rejected_value_fails_only_its_caller(self) -> None:
+        batcher = api.AnswersBatcher(0.01, 100)
+        values: list[models.answers.Value] = [self.value(i) for i in range(5)]
+        values[2] = models.answers.TextValue(question_id=uuid4(), text="")
+        results = await gather(
+            *(batcher.add_value(self.backend.poll.id, value) for value in values),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(self.backend.requests, 1)
+        self.assertEqual(statuses(results), [200, 200, 422, 200, 200])
+
+    async def test_failed_request_fails_whole_batch(self) -> None:
+        batcher = api.AnswersBatcher(0.01, 100)
+        self.backend.failing = True
+        results = await gather(
+            *(batcher.add_value(self.backend.poll.id, self.value(i)) for i in range(5)),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(self.backend.requests, 1)
+        self.assertEqual(statuses(results), [503] * 5)
+
+    async def test_polls_are_batched_separately(self) -> None:
+        batcher = api.AnswersBatcher(0.01, 100)
+        results = await gather(
+            batcher.add_value(self.backend.poll.id, self.value(0)),
+            batcher.add_value(self.backend.poll.id + 1, self.value(1)),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(self.backend.requests, 2)
+        self.assertEqual(statuses(results), [200, 404])
@@ -0,0 +1,69 @@
+from asyncio import Event, sleep, wait_for
+from functools import partial
+from unittest import IsolatedAsyncioTestCase
+
+from aiogram import Bot
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from dispatch import Lane, OrderedDispatcher, update_lane
+from settings import settings
+
+
+def callback(chat_id: int, user_id: int) -> Update:
+    return Update(
+        update_id=1,
+        callback_query={
+            "id": "1",
+            "chat_instance": "1",
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "data": "data",
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "group"},
+            },
+        },
+    )
+
+
+class OrderedDispatcherTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.dp = OrderedDispatcher(Bot(settings.token), MemoryStorage(), 10)
+        self.calls: list[tuple[Lane, int]] = []
+
+    async def call(self, lane: Lane, index: int, release: Event) -> None:
+        await release.wait()
+        self.calls.append((lane, index))
+
+    def test_group_callbacks_are_laned_per_user(self) -> None:
+        self.assertEqual(update_lane(callback(-1, 1)), (-1, 1))
+        self.assertEqual(update_lane(callback(-1, 2)), (-1, 2))
+
+    async def test_lanes_run_concurrently(self) -> None:
+        blocked = Event()
+        released = Event()
+        released.set()
+        first = self.dp.run_in_lane((-1, 1), partial(self.call, (-1, 1), 0, blocked))
+        second = self.dp.run_in_lane((-1, 2), partial(self.call, (-1, 2), 0, released))
+
+        await wait_for(second, 1)
+        self.assertFalse(first.done())
+        blocked.set()
+        await wait_for(first, 1)
+
+        self.assertEqual(self.calls, [((-1, 2), 0), ((-1, 1), 0)])
+
+    async def test_lane_runs_in_order(self) -> None:
+        release = Event()
+        futures = [
+            self.dp.run_in_lane((-1, 1), partial(self.call, (-1, 1), i, release))
+            for i in range(3)
+        ]
+        await sleep(0)
+        release.set()
+        for future in futures:
+            await wait_for(future, 1)
+
+        self.assertEqual(self.calls, [((-1, 1), 0), ((-1, 1), 1), ((-1, 1), 2)])
+        self.assertEqual(self.dp.lanes, {})
@@ -0,0 +1,40 @@
+from time import sleep
+from unittest import TestCase
+
+from aiogram import Bot
+
+from flood import FloodControl
+from outbound import DeleteBatcher
+from settings import settings
+
+
+class FloodControlTest(TestCase):
+    def setUp(self) -> None:
+        deleter = DeleteBatcher(Bot(settings.token), 1, 100)
+        self.flood = FloodControl(20, 2, 2, deleter)
+
+    def test_drops_over_burst(self) -> None:
+        self.assertEqual(
+            [self.flood.allow(1) for _ in range(4)], [True, True, False, False]
+        )
+        self.assertTrue(self.flood.allow(2))
+        self.assertEqual(self.flood.dropped, 2)
+
+    def test_notifies_once_per_refill(self) -> None:
+        for _ in range(3):
+            self.flood.allow(1)
+        self.assertTrue(self.flood.notify(1))
+        self.assertFalse(self.flood.notify(1))
+
+        sleep(0.06)
+        self.assertTrue(self.flood.allow(1))
+        self.assertFalse(self.flood.allow(1))
+        self.assertTrue(self.flood.notify(1))
+
+    def test_evicts_least_recent_users(self) -> None:
+        for user_id in (1, 2, 1, 3):
+            self.flood.allow(user_id)
+            self.flood.notify(user_id)
+
+        self.assertEqual(list(self.flood.buckets), [1, 3])
+        self.assertEqual(self.flood.notified, {1, 3})
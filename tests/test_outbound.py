@@ -0,0 +1,20 @@
+from unittest import TestCase
+
+from outbound import Priority, prioritized, request_priority
+
+
+class RequestPriorityTest(TestCase):
+    def test_method_default_without_context(self) -> None:
+        self.assertEqual(request_priority("deleteMessage"), Priority.notice)
+        self.assertEqual(request_priority("sendMessage"), Priority.reply)
+
+    def test_context_raises_method_default(self) -> None:
+        with prioritized(Priority.question):
+            self.assertEqual(request_priority("deleteMessage"), Priority.question)
+            self.assertEqual(request_priority("sendMessage"), Priority.question)
+
+    def test_context_does_not_lower_method_default(self) -> None:
+        with prioritized(Priority.notice):
+            self.assertEqual(request_priority("setMyCommands"), Priority.notice)
+        with prioritized(Priority.commands):
+            self.assertEqual(request_priority("deleteMessage"), Priority.notice)
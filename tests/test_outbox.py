@@ -0,0 +1,150 @@
+import json
+import os
+from asyncio import create_task, sleep, wait_for
+from tempfile import TemporaryDirectory
+from typing import Any
+
+import api
+import models
+from outbox import Entry, Outbox
+from settings import settings
+from tests.server import BackendTestCase
+
+
+class OutboxDeliveryTest(BackendTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.endpoints = dict(api.endpoints)
+        self.outbox = Outbox(None, 1, 0.01, 0.1)
+
+    async def asyncTearDown(self) -> None:
+        api.endpoints.update(self.endpoints)
+        await super().asyncTearDown()
+
+    def entry(self) -> Entry:
+        question = self.backend.poll.poll.plots[0].questions[0]
+        return Entry(
+            self.backend.poll.id,
+            models.answers.SelectorValue(
+                question_id=question.question_id, selected={0}
+            ),
+        )
+
+    async def test_transient_failure_is_retried(self) -> None:
+        self.backend.failing = True
+        entry = self.entry()
+        delivery = create_task(self.outbox.deliver(entry))
+        while entry.attempts == 0:
+            await sleep(0.01)
+
+        self.backend.failing = False
+        await wait_for(delivery, 1)
+
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(len(self.backend.answers), 1)
+
+    async def test_timed_out_answer_is_not_posted_again(self) -> None:
+        answers_timeout = settings.api_answers_timeout
+        settings.api_answers_timeout = 0.05
+        api.endpoints["answers/add/value"] = api.endpoint(idempotent=False)
+        settings.api_answers_timeout = answers_timeout
+        self.backend.latency = 0.2
+
+        with self.assertLogs("outbox", "ERROR") as logs:
+            await wait_for(self.outbox.deliver(self.entry()), 1)
+
+        self.assertIn("delivery is unknown", logs.output[0])
+        self.assertEqual(self.backend.requests, 1)
+
+    async def test_answer_endpoints_ignore_latency(self) -> None:
+        endpoint = api.endpoint(idempotent=False)
+        for _ in range(20):
+            endpoint.tracker.observe(0.001)
+
+        self.assertEqual(endpoint.tracker.timeout(), settings.api_answers_timeout)
+        self.assertIsNone(endpoint.hedge_quantile)
+
+
+class SpoolTest(BackendTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "answers.jsonl")
+
+    async def asyncTearDown(self) -> None:
+        self.directory.cleanup()
+        await super().asyncTearDown()
+
+    def value(self, index: int) -> models.answers.SelectorValue:
+        question = self.backend.poll.poll.plots[0].questions[0]
+        return models.answers.SelectorValue(
+            question_id=question.question_id, selected={index}
+        )
+
+    def records(self) -> list[dict[str, Any]]:
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+    async def test_appends_add_and_done_records(self) -> None:
+        outbox = Outbox(self.path, 1, 0.01, 0.1)
+        outbox.spool.start()
+        for index in range(3):
+            outbox.submit(self.backend.poll.id, self.value(index))
+        entry = next(iter(outbox.pending.values()))
+        outbox.done(entry)
+        await outbox.spool.close()
+
+        records = self.records()
+        self.assertEqual([record["op"] for record in records], ["add"] * 3 + ["done"])
+        self.assertEqual(records[3]["id"], entry.entry_id)
+
+    async def test_compacts_when_drained(self) -> None:
+        outbox = Outbox(self.path, 1, 0.01, 0.1)
+        outbox.spool.start()
+        for index in range(3):
+            outbox.submit(self.backend.poll.id, self.value(index))
+        await outbox.spool.flush()
+        self.assertEqual(len(self.records()), 3)
+
+        for entry in list(outbox.pending.values()):
+            outbox.done(entry)
+        await outbox.spool.close()
+
+        self.assertEqual(self.records(), [])
+
+    async def test_replays_undelivered_entries_after_restart(self) -> None:
+        outbox = Outbox(self.path, 1, 0.01, 0.1)
+        outbox.spool.start()
+        for index in range(3):
+            outbox.submit(self.backend.poll.id, self.value(index))
+        delivered = next(iter(outbox.pending.values()))
+        outbox.done(delivered)
+        await outbox.close()
+
+        outbox = Outbox(self.path, 1, 0.01, 0.1)
+        await outbox.start()
+        self.assertEqual(len(self.records()), 2)
+        while len(outbox.pending) > 0:
+            await sleep(0.01)
+        await outbox.close()
+
+        self.assertEqual(
+            [answer.answer.values[0] for answer in self.backend.answers],
+            [self.value(1), self.value(2)],
+        )
+        self.assertEqual(self.records(), [])
+
+    async def test_skips_damaged_records(self) -> None:
+        entry = Entry(self.backend.poll.id, self.value(0))
+        with open(self.path, "w") as file:
+            file.write(json.dumps(entry.record()) + "\n")
+            file.write('{"op": "add"}\n')
+            file.write('{"op": "add", "id": "1", "poll_id": 1, "value": {}}\n')
+            file.write('{"op": "done", "id": "2"\n')
+
+        with self.assertLogs("outbox", "WARNING") as logs:
+            entries = Outbox(self.path, 1, 0.01, 0.1).spool.load()
+
+        self.assertEqual(len(logs.output), 3)
+        self.assertEqual([loaded.entry_id for loaded in entries], [entry.entry_id])
+        self.assertEqual(self.records(), [entry.record()])
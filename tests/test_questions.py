@@ -0,0 +1,110 @@
+from asyncio import Event, Queue, wait_for
+from unittest import IsolatedAsyncioTestCase
+from uuid import UUID, uuid4
+
+from websockets.server import WebSocketServerProtocol, serve
+
+import api
+import models
+from settings import settings
+
+
+def frame(label: str, question_id: UUID | None = None) -> str:
+    return models.poll.TextQuestion(
+        label=label, question_id=question_id or uuid4()
+    ).json()
+
+
+class QuestionsHubTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.connections: Queue[WebSocketServerProtocol] = Queue()
+        self.server = await serve(self.connect, "127.0.0.1", 0)
+        self.received: Queue[models.poll.Question] = Queue()
+        self.hub = api.QuestionsHub(3)
+
+        self.settings = settings.copy()
+        port = next(iter(self.server.sockets)).getsockname()[1]
+        settings.websocket_url = f"ws://127.0.0.1:{port}"
+        settings.websocket_reconnect_delay = 0.01
+
+    async def asyncTearDown(self) -> None:
+        await self.hub.unsubscribe(1, 1)
+        self.server.close()
+        await self.server.wait_closed()
+        for name, value in self.settings:
+            setattr(settings, name, value)
+
+    async def connect(self, websocket: WebSocketServerProtocol) -> None:
+        await self.connections.put(websocket)
+        await websocket.wait_closed()
+
+    async def on_message(self, question: models.poll.Question) -> None:
+        await self.received.put(question)
+
+    async def send(self, websocket: WebSocketServerProtocol, data: str) -> str:
+        await websocket.send(data)
+        question = await wait_for(self.received.get(), 1)
+        return question.label
+
+    async def test_reconnects_after_disconnect(self) -> None:
+        await self.hub.subscribe(1, 1, self.on_message)
+        websocket = await wait_for(self.connections.get(), 1)
+        self.assertEqual(await self.send(websocket, frame("first")), "first")
+
+        await websocket.close()
+        websocket = await wait_for(self.connections.get(), 1)
+        self.assertEqual(await self.send(websocket, frame("second")), "second")
+
+    async def test_frames_are_capped(self) -> None:
+        await self.hub.subscribe(1, 1, self.on_message)
+        websocket = await wait_for(self.connections.get(), 1)
+        for index in range(5):
+            await self.send(websocket, frame(f"question {index}"))
+
+        self.assertEqual(
+            [question.label for question in self.hub.frames[1].values()],
+            ["question 2", "question 3", "question 4"],
+        )
+        self.assertEqual(len(self.hub.questions[1]), 3)
+
+    async def test_edited_question_replaces_its_frame(self) -> None:
+        await self.hub.subscribe(1, 1, self.on_message)
+        websocket = await wait_for(self.connections.get(), 1)
+        question_id = uuid4()
+        await self.send(websocket, frame("before", question_id))
+        await self.send(websocket, frame("after", question_id))
+
+        self.assertEqual(
+            [question.label for question in self.hub.frames[1].values()], ["after"]
+        )
+        question = self.hub.question(1, question_id)
+        assert question is not None
+        self.assertEqual(question.label, "after")
+
+    async def test_slow_subscriber_does_not_block_others(self) -> None:
+        release = Event()
+
+        async def blocked(question: models.poll.Question) -> None:
+            await release.wait()
+
+        await self.hub.subscribe(1, 2, blocked)
+        await self.hub.subscribe(1, 1, self.on_message)
+        websocket = await wait_for(self.connections.get(), 1)
+
+        self.assertEqual(await self.send(websocket, frame("first")), "first")
+        self.assertEqual(await self.send(websocket, frame("second")), "second")
+
+        release.set()
+        await self.hub.unsubscribe(1, 2)
+
+    async def test_replays_frames_to_new_subscribers(self) -> None:
+        await self.hub.subscribe(1, 2, self.on_message)
+        websocket = await wait_for(self.connections.get(), 1)
+        await self.send(websocket, frame("first"))
+        await self.send(websocket, frame("second"))
+
+        await self.hub.subscribe(1, 1, self.on_message)
+        labels = [(await wait_for(self.received.get(), 1)).label for _ in range(2)]
+
+        self.assertEqual(labels, ["first", "second"])
+        await self.hub.unsubscribe(1, 2)
@@ -0,0 +1,206 @@
+from asyncio import TimeoutError, create_task, sleep
+from time import perf_counter
+from typing import Any
+from unittest import TestCase
+
+import api
+import models
+from resilience import CircuitBreaker, CircuitOpen, Endpoint, LatencyTracker
+from tests.server import BackendTestCase
+
+
+def tracker(min_timeout: float = 1, max_timeout: float = 5) -> LatencyTracker:
+    return LatencyTracker(200, 0.99, 3, min_timeout, max_timeout)
+
+
+class LatencyTrackerTest(TestCase):
+    def test_max_timeout_until_enough_samples(self) -> None:
+        latencies = tracker()
+        for _ in range(9):
+            latencies.observe(0.1)
+
+        self.assertIsNone(latencies.quantile(0.5))
+        self.assertEqual(latencies.timeout(), 5)
+
+    def test_timeout_follows_quantile(self) -> None:
+        latencies = tracker(0.1, 5)
+        for latency in range(1, 101):
+            latencies.observe(latency / 100)
+
+        self.assertEqual(latencies.quantile(0.5), 0.51)
+        self.assertEqual(latencies.timeout(), 3)
+
+    def test_timeout_is_clamped(self) -> None:
+        latencies = tracker(1, 5)
+        for _ in range(10):
+            latencies.observe(0.01)
+        self.assertEqual(latencies.timeout(), 1)
+
+        for _ in range(10):
+            latencies.observe(10)
+        self.assertEqual(latencies.timeout(), 5)
+
+
+class CircuitBreakerTest(TestCase):
+    def test_opens_after_threshold(self) -> None:
+        breaker = CircuitBreaker(3, 60)
+        for _ in range(2):
+            self.assertFalse(breaker.check())
+            breaker.failure()
+        self.assertIsNone(breaker.opened_at)
+
+        breaker.failure()
+        with self.assertRaises(CircuitOpen):
+            breaker.check()
+
+    def test_success_resets_failures(self) -> None:
+        breaker = CircuitBreaker(3, 60)
+        breaker.failure()
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+
+        self.assertFalse(breaker.check())
+
+    def test_single_probe_after_reset(self) -> None:
+        breaker = CircuitBreaker(1, 0)
+        breaker.failure()
+
+        self.assertTrue(breaker.check())
+        with self.assertRaises(CircuitOpen):
+            breaker.check()
+
+        breaker.failure()
+        self.assertTrue(breaker.check())
+        breaker.success()
+        self.assertFalse(breaker.check())
+
+
+class EndpointTest(BackendTestCase):
+    async def get_poll(self, endpoint: Endpoint[Any]) -> models.poll.Poll:
+        api.endpoints["polls/get"] = endpoint
+        poll, _ = await api.polls_get(self.backend.poll.id)
+        assert poll is not None
+        return poll
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.endpoints = dict(api.endpoints)
+
+    async def asyncTearDown(self) -> None:
+        api.endpoints.update(self.endpoints)
+        await super().asyncTearDown()
+
+    async def test_open_circuit_stops_requests(self) -> None:
+        endpoint: Endpoint[Any] = Endpoint(
+            tracker(), CircuitBreaker(5, 0.2), None, api.transient
+        )
+        self.backend.failing = True
+
+        failed = rejected = 0
+        for _ in range(50):
+            try:
+                await self.get_poll(endpoint)
+            except CircuitOpen:
+                rejected += 1
+            except api.HTTPException:
+                failed += 1
+
+        self.assertEqual(self.backend.requests, 5)
+        self.assertEqual(failed, 5)
+        self.assertEqual(rejected, 45)
+
+        self.backend.failing = False
+        await sleep(0.2)
+        poll = await self.get_poll(endpoint)
+
+        self.assertEqual(poll.id, self.backend.poll.id)
+        self.assertIsNone(endpoint.breaker.opened_at)
+
+    async def test_client_errors_do_not_open_circuit(self) -> None:
+        endpoint: Endpoint[Any] = Endpoint(
+            tracker(), CircuitBreaker(1, 60), None, api.transient
+        )
+        api.endpoints["polls/get"] = endpoint
+
+        for _ in range(3):
+            with self.assertRaises(api.HTTPException):
+                await api.polls_get(self.backend.poll.id + 1)
+
+        self.assertEqual(self.backend.requests, 3)
+        self.assertIsNone(endpoint.breaker.opened_at)
+
+    async def test_slow_request_times_out(self) -> None:
+        endpoint: Endpoint[Any] = Endpoint(
+            tracker(0.05, 0.1), CircuitBreaker(1, 60), None, api.transient
+        )
+        self.backend.latency = 0.5
+
+        start = perf_counter()
+        with self.assertRaises(TimeoutError):
+            await self.get_poll(endpoint)
+
+        self.assertLess(perf_counter() - start, 0.4)
+        with self.assertRaises(CircuitOpen):
+            await self.get_poll(endpoint)
+
+    async def test_timeout_adapts_to_latency(self) -> None:
+        endpoint: Endpoint[Any] = Endpoint(
+            tracker(0.01, 5), CircuitBreaker(5, 60), None, api.transient
+        )
+        for _ in range(10):
+            await self.get_poll(endpoint)
+
+        self.assertLess(endpoint.tracker.timeout(), 1)
+
+    async def test_hedged_request_wins(self) -> None:
+        endpoint: Endpoint[Any] = Endpoint(
+            tracker(), CircuitBreaker(5, 60), 0.9, api.transient
+        )
+        for _ in range(10):
+            await self.get_poll(endpoint)
+        requests = self.backend.requests
+
+        self.backend.slow_rate = 1
+        self.backend.slow_latency = 1
+        start = perf_counter()
+        task = create_task(self.get_poll(endpoint))
+        while self.backend.requests == requests:
+            await sleep(0)
+        self.backend.slow_rate = 0
+        poll = await task
+
+        self.assertEqual(poll.id, self.backend.poll.id)
+        self.assertLess(perf_counter() - start, 0.5)
+        self.assertEqual(endpoint.hedged, 1)
+        self.assertEqual(self.backend.requests, requests + 2)
+
+    async def test_unhedged_request_waits(self) -> None:
+        endpoint: Endpoint[Any] = Endpoint(
+            tracker(), CircuitBreaker(5, 60), None, api.transient
+        )
+        for _ in range(10):
+            await self.get_poll(endpoint)
+        requests = self.backend.requests
+
+        self.backend.latency = 0.3
+        start = perf_counter()
+        await self.get_poll(endpoint)
+
+        self.assertGreaterEqual(perf_counter() - start, 0.3)
+        self.assertEqual(endpoint.hedged, 0)
+        self.assertEqual(self.backend.requests, requests + 1)
+
+    async def test_stale_poll_served_when_circuit_is_open(self) -> None:
+        endpoint: Endpoint[Any] = Endpoint(
+            tracker(), CircuitBreaker(1, 60), None, api.transient
+        )
+        api.endpoints["polls/get"] = endpoint
+        cache = api.PollCache(10, 60, 0)
+
+        poll = await cache.get(self.backend.poll.id)
+        self.backend.failing = True
+
+        self.assertEqual(await cache.get(self.backend.poll.id), poll)
+        self.assertEqual(await cache.get(self.backend.poll.id), poll)
+        self.assertEqual(self.backend.requests, 2)
@@ -0,0 +1,204 @@
+import os
+import sqlite3
+from asyncio import Queue, create_task, gather, sleep, wait_for
+from tempfile import TemporaryDirectory
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+from uuid import uuid4
+
+from websockets.server import WebSocketServerProtocol, serve
+
+import api
+from handlers import poll
+from session import Session
+from settings import settings
+from states import AnswersState, CodeState
+from storage import Key, Record, SQLiteStorage
+
+
+class StorageTestCase(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "fsm.db")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def storage(self, cache_size: int = 100) -> SQLiteStorage:
+        return SQLiteStorage(self.path, 60, 100, cache_size)
+
+    async def close(self, storage: SQLiteStorage) -> None:
+        await storage.close()
+        await storage.wait_closed()
+
+    def rows(self) -> dict[tuple[str, str], str | None]:
+        connection = sqlite3.connect(self.path)
+        try:
+            return {
+                (chat, user): state
+                for chat, user, state in connection.execute(
+                    "SELECT chat, user, state FROM fsm"
+                )
+            }
+        except sqlite3.OperationalError:
+            return {}
+        finally:
+            connection.close()
+
+
+class SQLiteStorageTest(StorageTestCase):
+    async def test_writes_are_coalesced(self) -> None:
+        storage = self.storage()
+        writes: list[list[tuple[Key, Record]]] = []
+        write = storage.write
+
+        def record_write(records: list[tuple[Key, Record]]) -> None:
+            writes.append(records)
+            write(records)
+
+        storage.write = record_write  # type: ignore[method-assign]
+        for index in range(50):
+            await storage.set_state(chat=index % 3, user=1, state=f"state {index}")
+            await storage.update_data(chat=index % 3, user=1, index=index)
+
+        self.assertEqual(self.rows(), {})
+        await storage.flush()
+
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(len(writes[0]), 3)
+        self.assertEqual(
+            self.rows(),
+            {("0", "1"): "state 48", ("1", "1"): "state 49", ("2", "1"): "state 47"},
+        )
+        await self.close(storage)
+
+    async def test_reads_after_reopen(self) -> None:
+        storage = self.storage()
+        await storage.set_state(chat=1, user=2, state="state")
+        await storage.set_data(chat=1, user=2, data={"session": Session(1, 1, 1)})
+        await storage.set_state(chat=3, user=4, state="state")
+        await storage.reset_state(chat=3, user=4)
+        await self.close(storage)
+
+        storage = self.storage()
+        self.assertEqual(await storage.get_state(chat=1, user=2), "state")
+        self.assertEqual(
+            await storage.get_data(chat=1, user=2), {"session": Session(1, 1, 1)}
+        )
+        self.assertEqual(self.rows(), {("1", "2"): "state"})
+        await self.close(storage)
+
+    async def test_load_racing_a_write_keeps_the_write(self) -> None:
+        storage = self.storage()
+        await storage.set_state(chat=1, user=1, state="old")
+        await self.close(storage)
+
+        storage = self.storage()
+        _, state = await gather(
+            storage.set_state(chat=1, user=1, state="new"),
+            storage.get_state(chat=1, user=1),
+        )
+
+        self.assertEqual(state, "new")
+        await storage.flush()
+        self.assertEqual(self.rows(), {("1", "1"): "new"})
+        await self.close(storage)
+
+    async def test_write_during_flush_stays_dirty(self) -> None:
+        storage = self.storage(cache_size=0)
+        await storage.set_state(chat=1, user=1, state="first")
+
+        flush = create_task(storage.flush())
+        while len(storage.flushing) == 0:
+            await sleep(0)
+        await storage.set_state(chat=1, user=1, state="second")
+        await flush
+
+        self.assertIn(("1", "1"), storage.dirty)
+        self.assertEqual(await storage.get_state(chat=1, user=1), "second")
+        await storage.flush()
+        self.assertEqual(self.rows(), {("1", "1"): "second"})
+        await self.close(storage)
+
+    async def test_dirty_records_are_not_evicted(self) -> None:
+        storage = self.storage(cache_size=1)
+        for chat in range(3):
+            await storage.set_state(chat=chat, user=1, state=f"state {chat}")
+        storage.evict()
+
+        self.assertEqual(len(storage.records), 3)
+        await storage.flush()
+        self.assertEqual(len(storage.records), 1)
+        for chat in range(3):
+            self.assertEqual(
+                await storage.get_state(chat=chat, user=1), f"state {chat}"
+            )
+        await self.close(storage)
+
+
+class RestoreAnswersStatesTest(StorageTestCase):
+    async def asyncSetUp(self) -> None:
+        self.connections: Queue[WebSocketServerProtocol] = Queue()
+        self.server = await serve(self.connect, "127.0.0.1", 0)
+        self.websocket_url = settings.websocket_url
+        port = next(iter(self.server.sockets)).getsockname()[1]
+        settings.websocket_url = f"ws://127.0.0.1:{port}"
+
+        self.dp_storage = poll.dp.storage
+        poll.dp.storage = self.storage()
+
+    async def asyncTearDown(self) -> None:
+        for user_id in (1, 2):
+            _, task = poll.questions_pull.pop(user_id, (None, None))
+            if task is not None:
+                task.cancel()
+            poll.reaper.forget(user_id, user_id)
+            await api.questions_hub.unsubscribe(7, user_id)
+
+        await self.close(poll.dp.storage)
+        poll.dp.storage = self.dp_storage
+        settings.websocket_url = self.websocket_url
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def connect(self, websocket: WebSocketServerProtocol) -> None:
+        await self.connections.put(websocket)
+        await websocket.wait_closed()
+
+    async def store(self, user_id: int, state: str, session: Session) -> None:
+        await poll.dp.storage.set_state(chat=user_id, user=user_id, state=state)
+        await poll.dp.storage.set_data(
+            chat=user_id, user=user_id, data={"session": session}
+        )
+
+    async def get_session(self, user_id: int) -> Any:
+        data = await poll.dp.storage.get_data(chat=user_id, user=user_id)
+        return data["session"]
+
+    async def test_restores_answering_sessions(self) -> None:
+        question_id = uuid4()
+        await self.store(
+            1, AnswersState.selector.state, Session(7, 1, 10, question_id=question_id)
+        )
+        await self.store(
+            2, "AnswersState:wait_top_list_rank", Session(7, 2, 20, question_id=uuid4())
+        )
+        await self.store(3, CodeState.wait_code.state, Session(7, 3, 30))
+
+        await poll.restore_answers_states()
+        await wait_for(self.connections.get(), 1)
+        await sleep(0.01)
+
+        self.assertEqual(set(poll.questions_pull), {1, 2})
+        self.assertIsNone(poll.questions_pull[1][1])
+        self.assertIsNotNone(poll.questions_pull[2][1])
+        self.assertEqual(set(api.questions_hub.subscribers[7]), {1, 2})
+        self.assertIn((1, 1), poll.reaper.seen)
+        self.assertIn((2, 2), poll.reaper.seen)
+
+        self.assertEqual((await self.get_session(1)).question_id, question_id)
+        self.assertIsNone((await self.get_session(2)).question_id)
+        self.assertEqual(
+            await poll.dp.storage.get_state(chat=2, user=2),
+            AnswersState.wait_question.state,
+        )
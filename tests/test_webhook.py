@@ -0,0 +1,80 @@
+from asyncio import Event, sleep, wait_for
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+
+from aiogram import Bot, Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from dispatch import OrderedDispatcher
+from settings import settings
+from webhook import WebhookServer
+
+
+def message(update_id: int, chat_id: int, text: str) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+            "text": text,
+        },
+    }
+
+
+class WebhookServerTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.dp = OrderedDispatcher(Bot(settings.token), MemoryStorage(), 10)
+        Dispatcher.set_current(self.dp)
+        self.release = Event()
+        self.handled: list[str] = []
+        self.dp.register_message_handler(self.handler)
+
+        self.server = WebhookServer(self.dp, 1000)
+        app = web.Application()
+        app.router.add_post("/webhook", self.server.handle)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self) -> None:
+        self.release.set()
+        await self.server.join()
+        await self.client.close()
+
+    async def handler(self, msg: Message) -> None:
+        if msg.text == "slow":
+            await self.release.wait()
+        if msg.text == "fail":
+            raise ValueError("Handler failed")
+        self.handled.append(msg.text)
+
+    async def post(self, update: dict[str, Any]) -> None:
+        response = await wait_for(self.client.post("/webhook", json=update), 1)
+        self.assertEqual(response.status, 200)
+
+    async def test_blocked_chat_does_not_stop_ingestion(self) -> None:
+        for update_id in range(100):
+            await self.post(message(update_id, 1, "slow"))
+        await self.post(message(100, 2, "fast"))
+        await wait_for(self.until(lambda: self.handled == ["fast"]), 1)
+
+        self.assertEqual(len(self.server.pending), 100)
+        self.release.set()
+        await wait_for(self.server.join(), 1)
+        self.assertEqual(len(self.handled), 101)
+
+    async def test_failed_update_is_logged(self) -> None:
+        with self.assertLogs("webhook", "ERROR") as logs:
+            await self.post(message(1, 1, "fail"))
+            await wait_for(self.server.join(), 1)
+
+        self.assertIn("Update 1 processing failed", logs.output[0])
+        self.assertEqual(self.server.pending, set())
+
+    async def until(self, condition: Any) -> None:
+        while not condition():
+            await sleep(0.01)
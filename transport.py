@@ -0,0 +1,117 @@
+import logging
+import ssl
+from asyncio import Task, create_task, sleep
+from dataclasses import dataclass
+
+import aiohttp
+import certifi
+from aiogram.utils import json
+
+from settings import settings
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    limit: int
+    limit_per_host: int
+    acquired: int
+    idle: int
+    waiting: int
+    hosts: dict[str, int]
+
+
+class Transport:
+    def __init__(
+        self,
+        pool_size: int,
+        pool_size_per_host: int,
+        keepalive_timeout: float,
+        dns_cache_ttl: int | None,
+        connect_timeout: float,
+        timeout: float,
+        stats_interval: float | None,
+    ) -> None:
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.stats_interval = stats_interval
+
+        self.session: aiohttp.ClientSession | None = None
+        self.connector: aiohttp.TCPConnector | None = None
+        self.task: Task[None] | None = None
+
+    @property
+    def client(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            raise RuntimeError("HTTP transport is not started")
+        return self.session
+
+    async def start(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            self.connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=self.dns_cache_ttl is not None,
+                ttl_dns_cache=self.dns_cache_ttl,
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+            )
+            self.session = aiohttp.ClientSession(
+                connector=self.connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout,
+                    connect=self.connect_timeout,
+                ),
+                json_serialize=json.dumps,
+            )
+            if self.stats_interval is not None:
+                self.task = create_task(self.report(self.stats_interval))
+        return self.session
+
+    def stats(self) -> PoolStats:
+        connector = self.connector
+        if connector is None or connector.closed:
+            return PoolStats(self.pool_size, self.pool_size_per_host, 0, 0, 0, {})
+
+        return PoolStats(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size_per_host,
+            acquired=len(connector._acquired),
+            idle=sum(len(conns) for conns in connector._conns.values()),
+            waiting=sum(len(waiters) for waiters in connector._waiters.values()),
+            hosts={
+                f"{key.host}:{key.port}": len(acquired)
+                for key, acquired in connector._acquired_per_host.items()
+                if len(acquired) > 0
+            },
+        )
+
+    async def report(self, interval: float) -> None:
+        while True:
+            await sleep(interval)
+            log.info("HTTP pool: %s", self.stats())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            self.connector = None
+
+
+transport = Transport(
+    settings.http_pool_size,
+    settings.http_pool_size_per_host,
+    settings.http_keepalive_timeout,
+    settings.http_dns_cache_ttl,
+    settings.http_connect_timeout,
+    settings.http_timeout,
+    settings.http_stats_interval,
+)
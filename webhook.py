@@ -0,0 +1,85 @@
+import logging
+from asyncio import Future, Semaphore, wait
+from functools import partial
+from typing import Any, Callable, Coroutine, TypeAlias
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from dispatch import OrderedDispatcher
+from settings import settings
+
+log = logging.getLogger(__name__)
+
+Callback: TypeAlias = Callable[[Dispatcher], Coroutine[None, None, None]]
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    def __init__(self, dispatcher: OrderedDispatcher, queue_size: int) -> None:
+        self.dispatcher = dispatcher
+        self.slots = Semaphore(queue_size)
+        self.pending: set[Future[Any]] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if (
+            settings.webhook_secret is not None
+            and request.headers.get(SECRET_HEADER) != settings.webhook_secret
+        ):
+            raise web.HTTPForbidden()
+
+        update = Update(**await request.json())
+        await self.slots.acquire()
+        future = self.dispatcher.feed(update)
+        self.pending.add(future)
+        future.add_done_callback(partial(self.done, update))
+        return web.Response()
+
+    def done(self, update: Update, future: Future[Any]) -> None:
+        self.pending.discard(future)
+        self.slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            log.error(
+                "Update %s processing failed",
+                update.update_id,
+                exc_info=future.exception(),
+            )
+
+    async def join(self) -> None:
+        if len(self.pending) > 0:
+            await wait(self.pending)
+
+
+def start_webhook(
+    dispatcher: OrderedDispatcher,
+    on_startup: Callback,
+    on_shutdown: Callback,
+) -> None:
+    assert settings.webhook_url is not None
+    server = WebhookServer(dispatcher, settings.webhook_queue_size)
+
+    async def startup(app: web.Application) -> None:
+        await on_startup(dispatcher)
+        await dispatcher.bot.set_webhook(
+            settings.webhook_url,
+            secret_token=settings.webhook_secret,
+        )
+
+    async def shutdown(app: web.Application) -> None:
+        await dispatcher.bot.delete_webhook()
+        await server.join()
+        await on_shutdown(dispatcher)
+        await dispatcher.storage.close()
+        await dispatcher.storage.wait_closed()
+
+    Dispatcher.set_current(dispatcher)
+    Bot.set_current(dispatcher.bot)
+
+    app = web.Application()
+    app.router.add_post(settings.webhook_path, server.handle)
+    app.on_startup.append(startup)  # type: ignore[arg-type]
+    app.on_shutdown.append(shutdown)  # type: ignore[arg-type]
+
+    web.run_app(app, host=settings.webhook_host, port=settings.webhook_port)